@@ -1,8 +1,18 @@
 import requests
 import json
+import os
+import sys
 import ollama
 import mcp_client
 
+# 与 AI/function_call_api 共用Ollama传输层: 长连接池、超时、重试退避和熔断
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'function_call_api'))
+from services import ollama_transport
+
+def get_client(server, timeout=30):
+    """获取指定Ollama服务地址的共享客户端, 读取超时为 timeout 秒"""
+    return ollama_transport.default().get_client(server, timeout)
+
 def api_generate(prompt, model="deepseek-r1:32b", timeout=30, server="http://192.168.1.179:11434", data_injection=True):
     """
     调用Ollama API生成文本
@@ -11,7 +21,7 @@ def api_generate(prompt, model="deepseek-r1:32b", timeout=30, server="http://192
         server (str): Ollama服务地址（默认http://192.168.1.179:11434）
         data_injection (bool): 是否启用MCP数据注入（默认True）
     """
-    client = ollama.Client(host=server)
+    client = get_client(server, timeout)
     # print(client.list())
     
     try:
@@ -9,4 +9,65 @@ OLLAMA_BASE_URL = "http://www.esunrising.net:11434"
 # 当temperature=1时，模型输出最具随机性，会按照概率分布随机采样；
 # temperature值越接近0，输出越稳定和确定，值越接近1，输出越具有创造性和随机性。
 # 在实际应用中，通常建议将temperature设置在0.1-0.3之间以获得相对稳定且合理的输出。
-OLLAMA_TEMPERATURE = 0.1
\ No newline at end of file
+OLLAMA_TEMPERATURE = 0.1
+# Ollama连接池大小, 所有LLM实例共享同一个连接池并保持长连接
+OLLAMA_POOL_SIZE = 10
+# 建立连接的超时时间(秒)
+OLLAMA_CONNECT_TIMEOUT = 5
+# 等待模型返回数据的超时时间(秒), 大模型生成较慢, 需设置得足够长
+OLLAMA_READ_TIMEOUT = 300
+# 连接失败或服务端返回 502/503/504 时的最大重试次数
+OLLAMA_MAX_RETRIES = 2
+# 重试的初始退避时间(秒), 每次重试翻倍
+OLLAMA_RETRY_BACKOFF = 0.5
+# 连续失败达到该次数后熔断, 熔断期间请求直接失败不再访问Ollama服务
+OLLAMA_BREAKER_THRESHOLD = 5
+# 熔断持续时间(秒), 到期后放行一个探测请求, 成功则恢复
+OLLAMA_BREAKER_RESET_SECONDS = 30
+
+# Agent配置
+# 同时执行的智能体请求数上限, 超出的请求会在事件循环中排队等待, 不会阻塞其他请求
+AGENT_MAX_CONCURRENCY = 4
+# 是否启用并行工具调用模式, 启用后智能体可在一步中给出多个互不依赖的工具调用, 并同时执行
+AGENT_PARALLEL_TOOLS = False
+
+# 会话配置
+# 内存中最多保留的会话数, 超出时淘汰最久未访问的会话
+SESSION_MAX_COUNT = 1000
+# 会话空闲超时时间(秒), 超时未访问的会话会被清除
+SESSION_TTL_SECONDS = 3600
+# 会话记忆类型:
+# - buffer: 保留完整对话历史
+# - window: 只保留最近 SESSION_WINDOW_SIZE 轮对话, 提示词长度固定
+# - summary: 超出 SESSION_SUMMARY_MAX_TOKENS 的历史由LLM总结为摘要(计算token数需要安装 transformers)
+SESSION_MEMORY_TYPE = "buffer"
+# window 模式下保留的对话轮数
+SESSION_WINDOW_SIZE = 5
+# summary 模式下保留原文的最大token数
+SESSION_SUMMARY_MAX_TOKENS = 1000
+# 会话存储后端:
+# - memory: 会话只保存在进程内存中, 重启后丢失
+# - sqlite: 会话消息逐条追加写入 SESSION_DB_PATH 指定的SQLite文件, 多个 uvicorn worker 可共享会话
+SESSION_BACKEND = "memory"
+# sqlite 后端的数据库文件路径
+SESSION_DB_PATH = "sessions.db"
+
+# 工具结果缓存配置
+# 按工具名称配置缓存有效期(秒), 未配置的工具不缓存; 有副作用的工具(如 CreateTextFile)不应加入缓存
+TOOL_CACHE_TTL = {
+    "GetWeather": 600,
+    "GetPopulation": 86400,
+    "GetIncome": 86400,
+}
+# 工具结果缓存的最大条目数, 写入时超出上限先清除过期条目, 仍超出则淘汰最久未使用的条目
+TOOL_CACHE_MAX_ENTRIES = 1000
+
+# LLM响应缓存配置
+# 是否启用LLM响应缓存, 缓存键由模型参数(模型名称、temperature等)和完整提示词组成
+LLM_CACHE_ENABLED = True
+# 缓存数据库文件路径
+LLM_CACHE_PATH = "llm_cache.db"
+# 缓存最大占用字节数, 超出时淘汰最久未访问的条目
+LLM_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# 是否对提示词做归一化(全角转半角、合并空白字符)后再匹配, 开启后写法略有差异的相同问题也能命中缓存
+LLM_CACHE_NORMALIZE = False
@@ -4,9 +4,11 @@ from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from langchain.schema import HumanMessage
-from services.agent_service import create_tools, create_llm, create_agent
+from services.agent_service import agent_factory, llm_cache
 from services.stream_service import create_stream_response
 from services.session_service import session_manager
+from services.cache_service import tool_cache
+from services import ollama_transport
 
 app = FastAPI(
     title="Function Call API",
@@ -33,42 +35,44 @@ async def chat(request: ChatRequest):
         # 获取会话记忆
         memory = session_manager.get_memory(request.session_id)
         
-        # 创建工具列表
-        tools = create_tools()
-        
-        # 创建LLM实例
-        llm = create_llm()
-        
-        # 创建Agent实例，并传入会话记忆
-        agent = create_agent(tools, llm, memory)
-        
         # 创建用户消息并处理
         message = HumanMessage(content=request.content)
-        response = agent.invoke({"input": message.content})
+        if memory.chat_memory.messages:
+            # 获取预热的Agent实例，并挂载会话记忆
+            agent = agent_factory.get_agent(memory)
+            response = await agent_factory.ainvoke(agent, message.content)
+        else:
+            # 没有会话历史时与相同的并发请求合并，再把本轮对话写入会话记忆
+            response = await agent_factory.ainvoke_coalesced(message.content)
+            await memory.asave_context({"input": message.content}, {"output": response.get('output')})
         print("response", response)
         return {"response": response.get('output')}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# @app.post("/chat/stream")
-# async def stream_chat(request: ChatRequest):
-#     try:
-#         # 获取会话记忆
-#         memory = session_manager.get_memory(request.session_id)
-        
-#         # 创建工具列表
-#         tools = create_tools()
-        
-#         # 创建LLM实例
-#         llm = create_llm()
-        
-#         # 创建流式响应
-#         return StreamingResponse(
-#             create_stream_response(tools, llm, request.content, memory),
-#             media_type="text/event-stream"
-#         )
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=str(e))
+@app.post("/chat/stream")
+async def stream_chat(request: ChatRequest):
+    try:
+        # 获取会话记忆
+        memory = session_manager.get_memory(request.session_id)
+
+        # 创建流式响应
+        return StreamingResponse(
+            create_stream_response(request.content, memory),
+            media_type="text/event-stream"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "sessions": session_manager.stats(),
+        "tool_cache": tool_cache.stats(),
+        "llm_cache": llm_cache.stats() if llm_cache is not None else None,
+        "ollama_circuit": ollama_transport.default().breaker.state,
+        "coalesced_chat": agent_factory.single_flight.stats()
+    }
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,14 +1,45 @@
 from langchain.tools import Tool, StructuredTool
 from langchain_ollama import OllamaLLM
-from langchain.agents import initialize_agent, AgentType
+from langchain.agents import initialize_agent, AgentType, AgentExecutor
 from langchain.memory import ConversationBufferMemory
 from langchain.callbacks.base import BaseCallbackHandler
-from langchain.schema import AgentAction, AgentFinish, LLMResult
-from typing import Dict, List, Any
+from langchain.agents.structured_chat.output_parser import StructuredChatOutputParser
+from langchain.agents.structured_chat.prompt import FORMAT_INSTRUCTIONS
+from langchain.schema import AgentAction, AgentFinish, LLMResult, OutputParserException
+from typing import Dict, List, Any, Union
+import asyncio
+import json
+import threading
 
 from models.schemas import GetWeather, GetPopulation, GetIncome, CreateTextFile
 from tools.info_tools import get_weather, get_population, get_income, create_text_file
-from config.settings import OLLAMA_BASE_URL, OLLAMA_MODEL, OLLAMA_TEMPERATURE
+from config.settings import (OLLAMA_BASE_URL, OLLAMA_MODEL, OLLAMA_TEMPERATURE, AGENT_MAX_CONCURRENCY, AGENT_PARALLEL_TOOLS,
+                             TOOL_CACHE_TTL, LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES, LLM_CACHE_NORMALIZE)
+from services.cache_service import tool_cache, SQLiteLLMCache
+from services import ollama_transport
+from services.coalesce_service import SingleFlight
+
+# LLM响应缓存, 未启用时为 None
+llm_cache = SQLiteLLMCache(
+    LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES, LLM_CACHE_NORMALIZE,
+    llm_params={"model": OLLAMA_MODEL, "temperature": OLLAMA_TEMPERATURE, "base_url": OLLAMA_BASE_URL}
+) if LLM_CACHE_ENABLED else None
+
+def cached_tool_func(name, func, args_schema):
+    """按 TOOL_CACHE_TTL 配置为工具函数加上结果缓存, 未配置的工具原样返回
+
+    Args:
+        name (str): 工具名称
+        func (Callable): 工具函数
+        args_schema (type): 工具的参数模型, 用于生成缓存键
+
+    Returns:
+        Callable: 工具函数
+    """
+    ttl = TOOL_CACHE_TTL.get(name)
+    if not ttl:
+        return func
+    return tool_cache.wrap(name, func, args_schema, ttl)
 
 def create_tools():
     """创建工具列表
@@ -19,7 +50,7 @@ def create_tools():
     # 创建一个名为 "GetWeather" 的工具实例，用于获取指定城市或地区的天气信息
     weather_tool = Tool(
         name="GetWeather",
-        func=get_weather,
+        func=cached_tool_func("GetWeather", get_weather, GetWeather),
         args_schema=GetWeather,
         description="使用本工具获取指定城市或地区的天气信息."
     )
@@ -27,7 +58,7 @@ def create_tools():
     # 创建一个名为 "GetPopulation" 的工具实例，用于获取指定城市或地区的人口信息
     population_tool = Tool(
         name="GetPopulation",
-        func=get_population,
+        func=cached_tool_func("GetPopulation", get_population, GetPopulation),
         args_schema=GetPopulation,
         description="使用本工具获取指定城市或地区的人口信息."
     )
@@ -35,7 +66,7 @@ def create_tools():
     # 创建一个名为 "GetIncome" 的工具实例，用于获取指定企业的年收入
     income_tool = StructuredTool(
         name="GetIncome",
-        func=get_income,
+        func=cached_tool_func("GetIncome", get_income, GetIncome),
         args_schema=GetIncome,
         description="使用本工具获取指定企业的年收入."
     )
@@ -43,7 +74,7 @@ def create_tools():
     # 创建一个名为 "CreateTextFile" 的工具实例，用于创建文本文件并写入内容
     text_file_tool = Tool(
         name="CreateTextFile",
-        func=create_text_file,
+        func=cached_tool_func("CreateTextFile", create_text_file, CreateTextFile),
         args_schema=CreateTextFile,
         description="使用本工具创建文本文件并写入内容."
     )
@@ -59,7 +90,11 @@ def create_llm():
     return OllamaLLM(
         model=OLLAMA_MODEL,
         base_url=OLLAMA_BASE_URL,
-        temperature=OLLAMA_TEMPERATURE
+        temperature=OLLAMA_TEMPERATURE,
+        cache=llm_cache,
+        # 共享长连接池、超时、重试和熔断配置
+        sync_client_kwargs=ollama_transport.client_kwargs(),
+        async_client_kwargs=ollama_transport.async_client_kwargs()
     )
 
 class StreamingCallbackHandler(BaseCallbackHandler):
@@ -141,4 +176,170 @@ def create_streaming_agent(tools, llm, callback_handler, memory=None):
         verbose = True,
         memory = memory,
         callbacks = [callback_handler]
-    )
\ No newline at end of file
+    )
+
+# 并行模式的格式说明: 在默认格式说明的基础上允许一个 $JSON_BLOB 中给出动作列表
+PARALLEL_FORMAT_INSTRUCTIONS = FORMAT_INSTRUCTIONS.replace(
+    "Provide only ONE action per $JSON_BLOB, as shown:",
+    "Provide ONE action per $JSON_BLOB, as shown:"
+) + """
+
+When several tool calls do not depend on each other's results, put them in one $JSON_BLOB as a list of actions and they will be executed at the same time:
+
+```
+[
+  {{{{
+    "action": $TOOL_NAME,
+    "action_input": $INPUT
+  }}}},
+  {{{{
+    "action": $TOOL_NAME,
+    "action_input": $INPUT
+  }}}}
+]
+```"""
+
+class ParallelStructuredChatOutputParser(StructuredChatOutputParser):
+    """支持动作列表的输出解析器
+
+    LLM 在一个 $JSON_BLOB 中给出多个工具调用时返回 AgentAction 列表,
+    AgentExecutor 在异步执行(ainvoke)时会通过 asyncio.gather 同时执行这些工具。
+    """
+
+    def parse(self, text: str) -> Union[AgentAction, List[AgentAction], AgentFinish]:
+        try:
+            action_match = self.pattern.search(text)
+            response = json.loads(action_match.group(1).strip(), strict=False) if action_match else None
+        except Exception as e:
+            raise OutputParserException(f"Could not parse LLM output: {text}") from e
+        if not isinstance(response, list) or len(response) < 2 or any(
+                not isinstance(item, dict) or item.get("action") in (None, "Final Answer") for item in response):
+            return super().parse(text)
+
+        # 第一个动作保留完整的LLM输出, 其余动作的日志只记录自身, 避免中间步骤中重复出现整段输出
+        return [
+            AgentAction(
+                item["action"],
+                item.get("action_input", {}),
+                text if i == 0 else f"Action:\n```\n{json.dumps(item, ensure_ascii=False)}\n```"
+            )
+            for i, item in enumerate(response)
+        ]
+
+def create_parallel_agent(tools, llm, memory=None):
+    """创建支持并行工具调用的Agent实例
+
+    Args:
+        tools (list): 工具列表
+        llm (BaseLLM): 大语言模型实例
+        memory (ConversationBufferMemory, optional): 对话历史记忆对象
+
+    Returns:
+        AgentExecutor: 可在一步中同时执行多个工具的智能体实例, 需通过 ainvoke 调用才会并行
+    """
+    if memory is None:
+        memory = ConversationBufferMemory()
+
+    return initialize_agent(
+        tools = tools,
+        llm = llm,
+        agent = AgentType.STRUCTURED_CHAT_ZERO_SHOT_REACT_DESCRIPTION,
+        verbose = True,
+        memory = memory,
+        agent_kwargs = {
+            "output_parser": ParallelStructuredChatOutputParser(),
+            "format_instructions": PARALLEL_FORMAT_INSTRUCTIONS
+        }
+    )
+
+class AgentFactory:
+    """预热的智能体工厂
+
+    工具列表、LLM实例和智能体(提示词模板、输出解析器)在进程内只构建一次，
+    每次请求只创建一个轻量的 AgentExecutor 并挂载该会话的记忆对象。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tools = None
+        self._llm = None
+        self._agent = None
+        self._semaphore = None
+        self.single_flight = SingleFlight()
+
+    def _warm_up(self) -> None:
+        """首次使用时构建工具、LLM和智能体，多线程下只构建一次"""
+        if self._agent is not None:
+            return
+        with self._lock:
+            if self._agent is not None:
+                return
+            tools = create_tools()
+            llm = create_llm()
+            builder = create_parallel_agent if AGENT_PARALLEL_TOOLS else create_agent
+            self._agent = builder(tools, llm).agent
+            self._tools = tools
+            self._llm = llm
+
+    @property
+    def tools(self) -> list:
+        self._warm_up()
+        return self._tools
+
+    @property
+    def llm(self) -> OllamaLLM:
+        self._warm_up()
+        return self._llm
+
+    def get_agent(self, memory=None) -> AgentExecutor:
+        """获取挂载了指定会话记忆的智能体实例
+
+        Args:
+            memory (ConversationBufferMemory, optional): 对话历史记忆对象
+
+        Returns:
+            AgentExecutor: 复用预热智能体和工具的执行器
+        """
+        self._warm_up()
+        if memory is None:
+            memory = ConversationBufferMemory()
+
+        return AgentExecutor.from_agent_and_tools(
+            agent = self._agent,
+            tools = self._tools,
+            verbose = True,
+            memory = memory
+        )
+
+    async def ainvoke(self, agent: AgentExecutor, content: str, **kwargs) -> Dict[str, Any]:
+        """在事件循环中异步执行智能体，并发数受 AGENT_MAX_CONCURRENCY 限制
+
+        Args:
+            agent (AgentExecutor): 通过 get_agent 获取的智能体实例
+            content (str): 用户输入内容
+            **kwargs: 透传给 agent.ainvoke 的参数, 如 config
+
+        Returns:
+            dict: 智能体的返回结果, 通过 response.get('output') 获取回复
+        """
+        # 信号量需在事件循环内创建
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(AGENT_MAX_CONCURRENCY)
+        async with self._semaphore:
+            return await agent.ainvoke({"input": content}, **kwargs)
+
+    async def ainvoke_coalesced(self, content: str) -> Dict[str, Any]:
+        """执行没有会话历史的请求, 相同的并发请求只调用一次LLM并共享结果
+
+        结果不依赖会话记忆, 调用方需自行把本轮对话写入会话记忆。
+
+        Args:
+            content (str): 用户输入内容
+
+        Returns:
+            dict: 智能体的返回结果, 通过 response.get('output') 获取回复
+        """
+        key = (content, tuple(tool.name for tool in self.tools), OLLAMA_MODEL, OLLAMA_TEMPERATURE)
+        return await self.single_flight.do(key, lambda: self.ainvoke(self.get_agent(), content))
+
+# 创建全局智能体工厂实例
+agent_factory = AgentFactory()
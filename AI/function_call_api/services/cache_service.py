@@ -0,0 +1,223 @@
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Type
+from collections import OrderedDict
+from contextlib import contextmanager
+import functools
+import hashlib
+import inspect
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pydantic import BaseModel
+from langchain.load import dumps, loads
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+
+from config.settings import TOOL_CACHE_MAX_ENTRIES
+
+class ToolCache:
+    """工具结果缓存
+
+    缓存键由工具名称和经过 pydantic 参数模型校验后的参数组成, 同一参数的不同写法
+    (如 year="2023" 与 year=2023)命中同一条缓存。条目数超过 max_entries 时,
+    写入时先清除过期条目, 仍超出则淘汰最久未使用的条目。
+
+    Args:
+        max_entries: 最大缓存条目数
+    """
+    def __init__(self, max_entries: int = TOOL_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+        self._evicted = 0
+
+    @staticmethod
+    def make_key(name: str, args_schema: Type[BaseModel], arguments: Dict[str, Any]) -> Tuple[str, str]:
+        """根据校验后的参数生成缓存键"""
+        args = args_schema.model_validate(arguments).model_dump(mode="json")
+        return name, json.dumps(args, sort_keys=True, ensure_ascii=False)
+
+    def wrap(self, name: str, func: Callable, args_schema: Type[BaseModel], ttl: float) -> Callable:
+        """为工具函数加上缓存
+
+        Args:
+            name: 工具名称
+            func: 工具函数
+            args_schema: 工具的参数模型
+            ttl: 缓存有效期(秒)
+
+        Returns:
+            Callable: 带缓存的工具函数, 签名与原函数一致
+        """
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def cached(*args, **kwargs):
+            arguments = signature.bind(*args, **kwargs).arguments
+            key = self.make_key(name, args_schema, arguments)
+            now = time.monotonic()
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > now:
+                    self._hits[name] = self._hits.get(name, 0) + 1
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                self._misses[name] = self._misses.get(name, 0) + 1
+            result = func(*args, **kwargs)
+            with self._lock:
+                self._entries[key] = (now + ttl, result)
+                self._entries.move_to_end(key)
+                self._evict(time.monotonic())
+            return result
+
+        return cached
+
+    def _evict(self, now: float) -> None:
+        """条目数超出上限时清除过期条目, 仍超出则淘汰最久未使用的条目"""
+        if len(self._entries) <= self.max_entries:
+            return
+        expired = [key for key, entry in self._entries.items() if entry[0] <= now]
+        for key in expired:
+            del self._entries[key]
+        self._evicted += len(expired)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evicted += 1
+
+    def clear(self) -> None:
+        """清空缓存和统计"""
+        with self._lock:
+            self._entries.clear()
+            self._hits.clear()
+            self._misses.clear()
+            self._evicted = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息
+
+        Returns:
+            dict: 未过期的缓存条目数、累计淘汰数, 以及每个工具的命中和未命中次数
+        """
+        with self._lock:
+            now = time.monotonic()
+            tools = {
+                name: {"hits": self._hits.get(name, 0), "misses": self._misses.get(name, 0)}
+                for name in set(self._hits) | set(self._misses)
+            }
+            return {
+                "entries": sum(1 for entry in self._entries.values() if entry[0] > now),
+                "evicted": self._evicted,
+                "hits": sum(self._hits.values()),
+                "misses": sum(self._misses.values()),
+                "tools": tools,
+            }
+
+# 创建全局工具缓存实例
+tool_cache = ToolCache()
+
+def normalize_prompt(prompt: str) -> str:
+    """提示词归一化: 全角字符转半角, 连续空白合并为一个空格, 去掉首尾空白"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", prompt)).strip()
+
+class SQLiteLLMCache(BaseCache):
+    """基于SQLite的LLM响应缓存, 通过 LangChain 的 cache 参数挂载到LLM上
+
+    缓存键为模型参数字符串、llm_params 与提示词的哈希, 总大小超过 max_bytes 时淘汰最久未访问的条目。
+    OllamaLLM 的参数字符串不含模型名、温度和服务地址, 这些参数需通过 llm_params 传入,
+    避免切换模型或服务后命中旧模型的缓存。
+
+    Args:
+        path: 数据库文件路径
+        max_bytes: 缓存最大占用字节数
+        normalize: 是否对提示词归一化后再匹配
+        llm_params: 参与缓存键计算的模型参数, 如模型名、温度和服务地址
+    """
+
+    def __init__(self, path: str, max_bytes: int, normalize: bool = False, llm_params: Optional[Dict[str, Any]] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.normalize = normalize
+        self.llm_params = json.dumps(llm_params or {}, sort_keys=True, ensure_ascii=False)
+        # 异步调用时 lookup 在线程池中执行, 计数需加锁
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, "
+                "value TEXT NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+
+    @contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        """创建数据库连接并在事务中执行"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _key(self, prompt: str, llm_string: str) -> str:
+        if self.normalize:
+            prompt = normalize_prompt(prompt)
+        return hashlib.sha256(f"{self.llm_params}\n{llm_string}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self._key(prompt, llm_string)
+        with self.connect() as conn:
+            row = conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                with self._stats_lock:
+                    self._misses += 1
+                return None
+            conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        with self._stats_lock:
+            self._hits += 1
+        return loads(row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        value = dumps(return_val)
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, accessed_at) VALUES (?, ?, ?, ?)",
+                (self._key(prompt, llm_string), value, size, time.time())
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """总大小超出上限时按最久未访问的顺序删除条目"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at").fetchall():
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self, **kwargs: Any) -> None:
+        with self.connect() as conn:
+            conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息
+
+        Returns:
+            dict: 缓存条目数、占用字节数及命中和未命中次数
+        """
+        with self.connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        with self._stats_lock:
+            return {"entries": entries, "bytes": size, "hits": self._hits, "misses": self._misses}
@@ -0,0 +1,41 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+
+class SingleFlight:
+    """合并相同的并发请求
+
+    同一个键同时只执行一次计算, 计算期间到达的相同请求等待并共享同一个结果。
+    计算在独立任务中执行, 发起者断开连接不会影响其他等待者。
+    """
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._executed = 0
+        self._shared = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """执行或加入指定键的计算
+
+        Args:
+            key: 请求的键, 键相同的并发请求共享结果
+            func: 返回协程的函数, 只在没有进行中的相同请求时调用
+
+        Returns:
+            Any: 计算结果
+        """
+        task = self._calls.get(key)
+        if task is None:
+            self._executed += 1
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self._shared += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        """获取统计信息
+
+        Returns:
+            dict: 进行中的计算数、实际执行次数和共享结果的请求数
+        """
+        return {"in_flight": len(self._calls), "executed": self._executed, "shared": self._shared}
@@ -0,0 +1,220 @@
+"""Ollama客户端共用的传输层: 长连接池、超时、重试退避和熔断
+
+AI/function_call_api 和 AI/MCP 都通过本模块的 OllamaTransport 创建客户端, 各自只负责从自己的配置中读取参数。
+backend 单独打包运行, 在 backend/ollama_transport.py 中保留了一份副本, 修改时两边保持一致。
+"""
+from typing import Any, Dict, Optional
+import asyncio
+import threading
+import time
+import httpx
+import ollama
+
+# 可重试的状态码和异常, 只重试未真正开始生成的请求
+RETRY_STATUS_CODES = {502, 503, 504}
+RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+class CircuitOpenError(httpx.TransportError):
+    """熔断期间直接拒绝请求时抛出的异常"""
+
+class CircuitBreaker:
+    """熔断器
+
+    连续失败 failure_threshold 次后进入熔断状态, reset_timeout 秒后放行一个探测请求,
+    探测成功则恢复, 失败则继续熔断。
+
+    Args:
+        failure_threshold: 触发熔断的连续失败次数
+        reset_timeout: 熔断持续时间(秒)
+    """
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def allow(self) -> bool:
+        """判断当前是否允许发出请求"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if self._probing else "open"
+
+class ResilientTransport(httpx.HTTPTransport):
+    """带重试退避和熔断的同步传输层, 连接池由 httpx 维护并保持长连接
+
+    Args:
+        breaker: 熔断器
+        max_retries: 最大重试次数
+        backoff: 初始退避时间(秒)
+        **kwargs: 透传给 httpx.HTTPTransport 的参数, 如 limits
+    """
+    def __init__(self, breaker: CircuitBreaker, max_retries: int, backoff: float, **kwargs):
+        super().__init__(**kwargs)
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.breaker.allow():
+            raise CircuitOpenError("Ollama服务熔断中, 请稍后重试", request=request)
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = super().handle_request(request)
+            except RETRY_EXCEPTIONS:
+                if last_attempt:
+                    self.breaker.record_failure()
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+            except httpx.TransportError:
+                self.breaker.record_failure()
+                raise
+            if response.status_code in RETRY_STATUS_CODES and not last_attempt:
+                response.close()
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return response
+
+class AsyncResilientTransport(httpx.AsyncHTTPTransport):
+    """带重试退避和熔断的异步传输层, 与同步传输层共享熔断器
+
+    Args:
+        breaker: 熔断器
+        max_retries: 最大重试次数
+        backoff: 初始退避时间(秒)
+        **kwargs: 透传给 httpx.AsyncHTTPTransport 的参数, 如 limits
+    """
+    def __init__(self, breaker: CircuitBreaker, max_retries: int, backoff: float, **kwargs):
+        super().__init__(**kwargs)
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.breaker.allow():
+            raise CircuitOpenError("Ollama服务熔断中, 请稍后重试", request=request)
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = await super().handle_async_request(request)
+            except RETRY_EXCEPTIONS:
+                if last_attempt:
+                    self.breaker.record_failure()
+                    raise
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+                continue
+            except httpx.TransportError:
+                self.breaker.record_failure()
+                raise
+            if response.status_code in RETRY_STATUS_CODES and not last_attempt:
+                await response.aclose()
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+                continue
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return response
+
+class OllamaTransport:
+    """一组共享的熔断器、连接池和超时配置, 同一进程内的Ollama客户端共用一个实例
+
+    Args:
+        pool_size: 连接池大小
+        connect_timeout: 建立连接的超时时间(秒)
+        read_timeout: 等待模型返回数据的超时时间(秒)
+        max_retries: 连接失败或返回 502/503/504 时的最大重试次数
+        retry_backoff: 重试的初始退避时间(秒)
+        breaker_threshold: 触发熔断的连续失败次数
+        breaker_reset: 熔断持续时间(秒)
+    """
+    def __init__(self, pool_size: int, connect_timeout: float, read_timeout: float, max_retries: int,
+                 retry_backoff: float, breaker_threshold: int, breaker_reset: float):
+        self.connect_timeout = connect_timeout
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self.limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.transport = ResilientTransport(self.breaker, max_retries, retry_backoff, limits=self.limits)
+        self.async_transport = AsyncResilientTransport(self.breaker, max_retries, retry_backoff, limits=self.limits)
+        self._clients: Dict[tuple, ollama.Client] = {}
+        self._clients_lock = threading.Lock()
+
+    def _timeout(self, read_timeout: Optional[float]) -> httpx.Timeout:
+        return self.timeout if read_timeout is None else httpx.Timeout(read_timeout, connect=self.connect_timeout)
+
+    def client_kwargs(self, read_timeout: Optional[float] = None) -> Dict[str, Any]:
+        """同步 ollama.Client 使用的参数, 共享连接池和熔断器"""
+        return {"timeout": self._timeout(read_timeout), "transport": self.transport}
+
+    def async_client_kwargs(self, read_timeout: Optional[float] = None) -> Dict[str, Any]:
+        """异步 ollama.AsyncClient 使用的参数, 共享连接池和熔断器"""
+        return {"timeout": self._timeout(read_timeout), "transport": self.async_transport}
+
+    def get_client(self, host: str, read_timeout: Optional[float] = None) -> ollama.Client:
+        """获取指定Ollama服务地址的共享客户端
+
+        Args:
+            host: Ollama服务地址
+            read_timeout: 读取超时时间(秒), 为空时使用默认配置
+
+        Returns:
+            ollama.Client: 使用共享传输层的客户端
+        """
+        with self._clients_lock:
+            key = (host, read_timeout)
+            if key not in self._clients:
+                self._clients[key] = ollama.Client(host=host, **self.client_kwargs(read_timeout))
+            return self._clients[key]
+
+_default: Optional[OllamaTransport] = None
+_default_lock = threading.Lock()
+
+def default() -> OllamaTransport:
+    """按 config.settings 创建的进程内共享实例"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            from config.settings import (OLLAMA_POOL_SIZE, OLLAMA_CONNECT_TIMEOUT, OLLAMA_READ_TIMEOUT, OLLAMA_MAX_RETRIES,
+                                         OLLAMA_RETRY_BACKOFF, OLLAMA_BREAKER_THRESHOLD, OLLAMA_BREAKER_RESET_SECONDS)
+            _default = OllamaTransport(OLLAMA_POOL_SIZE, OLLAMA_CONNECT_TIMEOUT, OLLAMA_READ_TIMEOUT, OLLAMA_MAX_RETRIES,
+                                       OLLAMA_RETRY_BACKOFF, OLLAMA_BREAKER_THRESHOLD, OLLAMA_BREAKER_RESET_SECONDS)
+        return _default
+
+def client_kwargs() -> Dict[str, Any]:
+    """默认实例的同步客户端参数"""
+    return default().client_kwargs()
+
+def async_client_kwargs() -> Dict[str, Any]:
+    """默认实例的异步客户端参数"""
+    return default().async_client_kwargs()
@@ -1,22 +1,150 @@
-from typing import Dict
-from langchain.memory import ConversationBufferMemory
+from typing import Dict, Any, List
+from collections import OrderedDict
+import asyncio
+import threading
+import time
+from langchain.memory import ConversationBufferMemory, ConversationBufferWindowMemory, ConversationSummaryBufferMemory
+from langchain.schema import BaseChatMessageHistory, BaseMemory, BaseMessage
+
+from config.settings import (SESSION_MAX_COUNT, SESSION_TTL_SECONDS, SESSION_MEMORY_TYPE,
+                             SESSION_WINDOW_SIZE, SESSION_SUMMARY_MAX_TOKENS, SESSION_BACKEND, SESSION_DB_PATH)
+from services.session_store import SessionStore, SQLiteChatMessageHistory, create_session_store
+
+class PersistentSummaryBufferMemory(ConversationSummaryBufferMemory):
+    """使用持久化消息历史的摘要记忆
+
+    父类通过修改 chat_memory.messages 返回的列表删除已总结的消息, 而持久化的消息历史每次读取都返回新列表,
+    消息永远不会被删除。这里改为调用消息历史的 prune 删除消息并保存摘要, 读取时从存储加载摘要,
+    多个进程共享同一会话时看到的是同一份摘要。
+    """
+
+    def _prune_count(self, buffer: List[BaseMessage]) -> int:
+        """计算需要总结并删除的最早消息数"""
+        count = 0
+        while count < len(buffer) and self.llm.get_num_tokens_from_messages(buffer[count:]) > self.max_token_limit:
+            count += 1
+        return count
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        self.moving_summary_buffer = self.chat_memory.summary
+        return super().load_memory_variables(inputs)
+
+    async def aload_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        self.moving_summary_buffer = self.chat_memory.summary
+        return await super().aload_memory_variables(inputs)
+
+    def prune(self) -> None:
+        buffer = self.chat_memory.messages
+        count = self._prune_count(buffer)
+        if count:
+            self.moving_summary_buffer = self.predict_new_summary(buffer[:count], self.chat_memory.summary)
+            self.chat_memory.prune(count, self.moving_summary_buffer)
+
+    async def aprune(self) -> None:
+        buffer = self.chat_memory.messages
+        count = self._prune_count(buffer)
+        if count:
+            self.moving_summary_buffer = await self.apredict_new_summary(buffer[:count], self.chat_memory.summary)
+            self.chat_memory.prune(count, self.moving_summary_buffer)
+
+class TrimmedWindowMemory(ConversationBufferWindowMemory):
+    """只保留最近 k 轮对话的窗口记忆
+
+    父类只限制写入提示词的消息, 消息历史仍会一直增长。这里每次保存后删除窗口之外的消息,
+    会话占用的内存和存储空间不随对话轮数增长。
+    """
+
+    def _trim(self) -> None:
+        keep = 2 * self.k
+        if isinstance(self.chat_memory, SQLiteChatMessageHistory):
+            self.chat_memory.trim(keep)
+            return
+        messages = self.chat_memory.messages
+        if len(messages) > keep:
+            del messages[:len(messages) - keep]
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        super().save_context(inputs, outputs)
+        self._trim()
+
+    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        await super().asave_context(inputs, outputs)
+        # 持久化存储的删除操作放到线程池中执行, 不阻塞事件循环
+        await asyncio.get_running_loop().run_in_executor(None, self._trim)
+
+def create_memory(chat_memory: BaseChatMessageHistory, memory_type: str = SESSION_MEMORY_TYPE) -> BaseMemory:
+    """根据配置创建会话记忆对象
+
+    Args:
+        chat_memory: 会话的消息历史对象, 由会话存储提供
+        memory_type: 记忆类型, 可选 buffer、window、summary
+
+    Returns:
+        BaseMemory: 会话记忆对象
+    """
+    if memory_type == "window":
+        return TrimmedWindowMemory(chat_memory=chat_memory, k=SESSION_WINDOW_SIZE)
+    if memory_type == "summary":
+        # 延迟导入, 复用预热的LLM实例生成摘要
+        from services.agent_service import agent_factory
+        memory_cls = PersistentSummaryBufferMemory if isinstance(chat_memory, SQLiteChatMessageHistory) else ConversationSummaryBufferMemory
+        return memory_cls(chat_memory=chat_memory, llm=agent_factory.llm, max_token_limit=SESSION_SUMMARY_MAX_TOKENS)
+    return ConversationBufferMemory(chat_memory=chat_memory)
+
+def memory_size(memory: BaseMemory) -> int:
+    """估算会话记忆占用的字节数(消息内容及摘要的UTF-8长度)"""
+    size = sum(len(str(message.content).encode("utf-8")) for message in memory.chat_memory.messages)
+    summary = getattr(memory, "moving_summary_buffer", "")
+    return size + len(summary.encode("utf-8"))
 
 class SessionManager:
-    def __init__(self):
-        self._sessions: Dict[str, ConversationBufferMemory] = {}
-    
-    def get_memory(self, session_id: str) -> ConversationBufferMemory:
+    def __init__(self, store: SessionStore, max_sessions: int = SESSION_MAX_COUNT, ttl: float = SESSION_TTL_SECONDS):
+        """
+        Args:
+            store: 会话存储, 持久化后端中被淘汰的只是内存中的记忆对象, 消息仍保留在存储中
+            max_sessions: 最多保留的会话数, 超出时淘汰最久未访问的会话
+            ttl: 会话空闲超时时间(秒), 小于等于0表示不过期
+        """
+        self._store = store
+        self._max_sessions = max_sessions
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        # 按最近访问顺序保存 session_id -> (记忆对象, 最近访问时间)
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._evicted = 0
+
+    def _evict(self, now: float) -> None:
+        """清除过期会话, 并在超出容量时淘汰最久未访问的会话"""
+        if self._ttl > 0:
+            while self._sessions:
+                session_id, (_, last_access) = next(iter(self._sessions.items()))
+                if now - last_access < self._ttl:
+                    break
+                del self._sessions[session_id]
+                self._evicted += 1
+        while len(self._sessions) > self._max_sessions:
+            self._sessions.popitem(last=False)
+            self._evicted += 1
+
+    def get_memory(self, session_id: str) -> BaseMemory:
         """获取指定会话的记忆对象，如果不存在则创建新的
         
         Args:
             session_id: 会话ID
             
         Returns:
-            ConversationBufferMemory: 会话记忆对象
+            BaseMemory: 会话记忆对象
         """
-        if session_id not in self._sessions:
-            self._sessions[session_id] = ConversationBufferMemory()
-        return self._sessions[session_id]
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            if session_id in self._sessions:
+                memory = self._sessions.pop(session_id)[0]
+            else:
+                memory = create_memory(self._store.history(session_id))
+            self._sessions[session_id] = (memory, now)
+            self._evict(now)
+            return memory
     
     def clear_memory(self, session_id: str) -> None:
         """清除指定会话的记忆
@@ -24,8 +152,25 @@ class SessionManager:
         Args:
             session_id: 会话ID
         """
-        if session_id in self._sessions:
-            del self._sessions[session_id]
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        self._store.delete(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取会话统计信息
+
+        Returns:
+            dict: 存活会话数、占用字节数和累计淘汰数
+        """
+        with self._lock:
+            self._evict(time.monotonic())
+            memories = [memory for memory, _ in self._sessions.values()]
+            evicted = self._evicted
+        return {
+            "sessions": len(memories),
+            "bytes": sum(memory_size(memory) for memory in memories),
+            "evicted": evicted,
+        }
 
 # 创建全局会话管理器实例
-session_manager = SessionManager()
\ No newline at end of file
+session_manager = SessionManager(create_session_store(SESSION_BACKEND, SESSION_DB_PATH))
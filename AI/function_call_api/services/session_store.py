@@ -0,0 +1,146 @@
+from typing import Iterator, List, Sequence
+from contextlib import contextmanager
+import json
+import sqlite3
+import time
+from langchain.memory import ChatMessageHistory
+from langchain.schema import BaseChatMessageHistory, BaseMessage, message_to_dict, messages_from_dict
+
+class SessionStore:
+    """会话存储接口, 为每个会话提供消息历史对象"""
+
+    def history(self, session_id: str) -> BaseChatMessageHistory:
+        """获取指定会话的消息历史对象"""
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        """删除指定会话的全部消息"""
+        raise NotImplementedError
+
+class InMemorySessionStore(SessionStore):
+    """进程内存存储, 消息历史随会话记忆对象一起被淘汰"""
+
+    def history(self, session_id: str) -> BaseChatMessageHistory:
+        return ChatMessageHistory()
+
+    def delete(self, session_id: str) -> None:
+        pass
+
+class SQLiteChatMessageHistory(BaseChatMessageHistory):
+    """基于SQLite的消息历史, 每条消息追加写入一行, 不重写整个会话
+
+    摘要记忆的摘要也保存在数据库中, 通过 summary 读取, prune 在同一事务中删除已总结的消息并保存新摘要。
+    """
+
+    def __init__(self, store: "SQLiteSessionStore", session_id: str):
+        self.store = store
+        self.session_id = session_id
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        with self.store.connect() as conn:
+            rows = conn.execute(
+                "SELECT message FROM messages WHERE session_id = ? ORDER BY id",
+                (self.session_id,)
+            ).fetchall()
+        return messages_from_dict([json.loads(row[0]) for row in rows])
+
+    def add_message(self, message: BaseMessage) -> None:
+        self.add_messages([message])
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        now = time.time()
+        with self.store.connect() as conn:
+            conn.executemany(
+                "INSERT INTO messages (session_id, message, created_at) VALUES (?, ?, ?)",
+                [(self.session_id, json.dumps(message_to_dict(message), ensure_ascii=False), now) for message in messages]
+            )
+
+    @property
+    def summary(self) -> str:
+        with self.store.connect() as conn:
+            row = conn.execute("SELECT summary FROM summaries WHERE session_id = ?", (self.session_id,)).fetchone()
+        return row[0] if row else ""
+
+    def prune(self, count: int, summary: str) -> None:
+        """删除最早的 count 条消息并保存摘要
+
+        Args:
+            count: 已被总结的消息数
+            summary: 包含这些消息的新摘要
+        """
+        with self.store.connect() as conn:
+            conn.execute(
+                "DELETE FROM messages WHERE id IN (SELECT id FROM messages WHERE session_id = ? ORDER BY id LIMIT ?)",
+                (self.session_id, count)
+            )
+            conn.execute("INSERT OR REPLACE INTO summaries (session_id, summary) VALUES (?, ?)", (self.session_id, summary))
+
+    def trim(self, keep: int) -> None:
+        """只保留最近的 keep 条消息
+
+        Args:
+            keep: 保留的消息数
+        """
+        with self.store.connect() as conn:
+            conn.execute(
+                "DELETE FROM messages WHERE session_id = ? AND id NOT IN "
+                "(SELECT id FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?)",
+                (self.session_id, self.session_id, keep)
+            )
+
+    def clear(self) -> None:
+        self.store.delete(self.session_id)
+
+class SQLiteSessionStore(SessionStore):
+    """SQLite文件存储, 使用WAL模式, 支持多进程同时读写同一会话
+
+    Args:
+        path: 数据库文件路径
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "session_id TEXT NOT NULL, "
+                "message TEXT NOT NULL, "
+                "created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)")
+            conn.execute("CREATE TABLE IF NOT EXISTS summaries (session_id TEXT PRIMARY KEY, summary TEXT NOT NULL)")
+
+    @contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        """创建数据库连接并在事务中执行, 每次操作使用独立连接以便在线程池和多进程中安全使用"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def history(self, session_id: str) -> BaseChatMessageHistory:
+        return SQLiteChatMessageHistory(self, session_id)
+
+    def delete(self, session_id: str) -> None:
+        with self.connect() as conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM summaries WHERE session_id = ?", (session_id,))
+
+def create_session_store(backend: str, path: str) -> SessionStore:
+    """根据配置创建会话存储
+
+    Args:
+        backend: 存储后端, 可选 memory、sqlite
+        path: sqlite 后端的数据库文件路径
+
+    Returns:
+        SessionStore: 会话存储实例
+    """
+    if backend == "sqlite":
+        return SQLiteSessionStore(path)
+    return InMemorySessionStore()
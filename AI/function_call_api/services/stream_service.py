@@ -1,40 +1,53 @@
 from typing import AsyncGenerator, Dict, Any
-from langchain.schema import HumanMessage
 from langchain.callbacks import AsyncIteratorCallbackHandler
-from services.agent_service import create_streaming_agent
+from services.agent_service import StreamingCallbackHandler, agent_factory
+import asyncio
 import json
 
-async def create_stream_response(tools, llm, content: str) -> AsyncGenerator[str, None]:
+def _format_event(event: Dict[str, Any]) -> str:
+    """将事件格式化为SSE数据帧，以便前端正确解析"""
+    return f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+async def create_stream_response(content: str, memory=None) -> AsyncGenerator[str, None]:
     """创建流式响应
-    
+
+    智能体一次回答会多次调用LLM，AsyncIteratorCallbackHandler 只作为事件队列使用，
+    由 StreamingCallbackHandler 把每个token、工具调用等事件写入队列，
+    直到整个智能体任务结束才停止输出。
+
     Args:
-        tools: 工具列表
-        llm: 大语言模型实例
         content: 用户输入内容
-    
+        memory (ConversationBufferMemory, optional): 会话记忆对象
+
     Returns:
         AsyncGenerator: 异步生成器，用于流式输出响应内容
     """
-    callback = AsyncIteratorCallbackHandler()
-    
-    # 创建支持流式输出的智能体
-    agent = create_streaming_agent(tools, llm, callback)
-    
+    loop = asyncio.get_running_loop()
+    iterator = AsyncIteratorCallbackHandler()
+
+    # 回调可能在线程池中触发，需通过 call_soon_threadsafe 写入队列
+    def on_new_token(event: Dict[str, Any]) -> None:
+        loop.call_soon_threadsafe(iterator.queue.put_nowait, event)
+
+    callback = StreamingCallbackHandler(on_new_token=on_new_token)
+
+    # 获取挂载会话记忆的智能体，并在后台任务中异步执行
+    agent = agent_factory.get_agent(memory)
+    task = asyncio.create_task(
+        agent_factory.ainvoke(agent, content, config={"callbacks": [callback]})
+    )
+    task.add_done_callback(lambda _: iterator.done.set())
+
     try:
-        # 异步生成响应
-        task = agent.ainvoke({"input": content})
-        
-        async for token in callback.aiter():
-            # 将token格式化为JSON字符串，以便前端正确解析
-            if isinstance(token, dict):
-                yield f"data: {json.dumps(token)}\n\n"
-            else:
-                yield f"data: {json.dumps({"type": "token", "data": token})}\n\n"
-            
-        # 等待任务完成
-        await task
+        async for event in iterator.aiter():
+            yield _format_event(event)
+
+        # 等待任务完成，输出最终回复
+        response = await task
+        yield _format_event({"type": "output", "data": response.get('output')})
     except Exception as e:
-        error_msg = {"type": "error", "data": str(e)}
-        yield f"data: {json.dumps(error_msg)}\n\n"
+        yield _format_event({"type": "error", "data": str(e)})
     finally:
-        callback.done.set()
\ No newline at end of file
+        # 客户端断开连接时生成器被关闭，停止后台智能体任务
+        if not task.done():
+            task.cancel()
@@ -12,7 +12,7 @@ from langchain.agents import initialize_agent, AgentType
 # 从 langchain.memory 模块导入 ConversationBufferMemory 类，用于创建会话缓冲区内存
 from langchain.memory import ConversationBufferMemory
 
-import rpa_run, ini_op, os, sys
+import rpa_run, ini_op, os, sys, ollama_transport
 BASE_DIR = os.path.dirname(os.path.realpath(sys.argv[0]))
 
 # 导入 Python 的 warnings 模块，该模块用于控制警告消息的显示
@@ -104,7 +104,10 @@ llm = OllamaLLM(
     model="qwen2.5",
     # 指定 Ollama 服务器的地址，用于与模型进行通信
     base_url="http://192.168.1.179:11434",
-    temperature = 0.1
+    temperature = 0.1,
+    # 使用共享的长连接池, 并设置超时、重试和熔断
+    sync_client_kwargs = ollama_transport.client_kwargs(),
+    async_client_kwargs = ollama_transport.async_client_kwargs()
 )
 
 
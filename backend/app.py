@@ -1,7 +1,7 @@
 from playwright.sync_api import sync_playwright
 from flask import Flask, request, render_template, Response, jsonify, send_from_directory
 from flask_cors import CORS
-import threading, socket, os, sys, subprocess, ini_op, time, rpa_login, duckdb, rpa_run
+import threading, socket, os, sys, subprocess, ini_op, time, rpa_login, duckdb, rpa_run, rpa_pool, rpa_jobs, rpa_events, multiprocessing
 from time import strftime
 
 from databaseRequest import database
@@ -26,12 +26,52 @@ def serve_react_app(path):
     else:
         return send_from_directory(app.template_folder, 'calc.html')
 
+def pdfDownloadJob(progress):
+    timenow = rpa_run.run(progress)
+    output_folder = ini_op.getinivalue('pdf_config', 'output_folder')[0]
+    return os.path.join(os.path.dirname(BASE_DIR), output_folder, timenow)
+
+# 提交凭证下载任务后立即返回任务编号，通过 /rpa/jobs/<id> 查询进度和输出路径
 @app.route('/rpa/pdfDownload/run')
 def run():
-    timenow = rpa_run.run()
+    job_id = rpa_jobs.job_manager.submit('pdfDownload', pdfDownloadJob)
+    return jsonify({"code":200, "jobId":job_id}), 200
+
+def batchDownloadJob(units, progress):
+    timenow = rpa_run.runBatch(units, progress)
     output_folder = ini_op.getinivalue('pdf_config', 'output_folder')[0]
-    pdfFilesPath = os.path.join(os.path.dirname(BASE_DIR), output_folder, timenow)
-    return jsonify({"code":200, "filePath":pdfFilesPath}), 200
+    return os.path.join(os.path.dirname(BASE_DIR), output_folder, timenow)
+
+# 批量归档多个单位，dwbh 参数为逗号分隔的单位编号，为空时读取配置中的单位列表
+@app.route('/rpa/pdfDownload/batch')
+def batch():
+    units = [unit.strip() for unit in request.args.get('dwbh', '').split(',') if unit.strip()]
+    job_id = rpa_jobs.job_manager.submit('pdfDownloadBatch', lambda progress: batchDownloadJob(units, progress))
+    return jsonify({"code":200, "jobId":job_id}), 200
+
+@app.route('/rpa/jobs')
+def jobs():
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({"code":200, "data":rpa_jobs.job_manager.history(limit)}), 200
+
+# 以SSE推送RPA进度事件（凭证下载开始/完成、整理结果、预计剩余时间），job参数可只订阅指定任务
+@app.route('/rpa/events')
+def events():
+    job_id = request.args.get('job')
+    return Response(rpa_events.bus.stream(job_id), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/rpa/jobs/<job_id>')
+def job(job_id):
+    data = rpa_jobs.job_manager.get(job_id)
+    if data is None:
+        return jsonify({"code":404, "msg":"任务不存在"}), 404
+    return jsonify({"code":200, "data":data}), 200
+
+# 常驻浏览器池的冷启动/热启动耗时统计
+@app.route('/rpa/pool/stats')
+def poolStats():
+    return jsonify({"code":200, "data":rpa_pool.pool.stats()}), 200
 
 # 浏览器启动函数
 #若已启动则取消再次运行
@@ -84,6 +124,8 @@ def open_browser2(app_port, chrome_port):
 
 
 if __name__ == '__main__':
+    # 打包为exe后整理PDF的多进程需要此调用
+    multiprocessing.freeze_support()
     app_port, chrome_port, browser_select, browser_path = ini_op.getinivalue('basic_config', 'app_port', 'chrome_port', 'browser_select', 'browser_path')
     # 仅在主进程中启动浏览器线程
     # if check_port_in_use(int(app_port)):
@@ -92,4 +134,6 @@ if __name__ == '__main__':
     #     else:
     #         browser_thread = threading.Thread(target=open_browser2, args=[app_port, chrome_port])
     #     browser_thread.start()
+    # 启动任务队列，同时把上次退出时未完成的任务标记为中断
+    rpa_jobs.job_manager.start()
     app.run(host='0.0.0.0',port=app_port, debug=True)
\ No newline at end of file
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+# Ollama客户端的传输层：长连接池、超时、重试退避和熔断，参数取自 config.ini 的 [ollama_config]
+# 后端单独打包运行，这里是 AI/function_call_api/services/ollama_transport.py 的副本，修改时两边保持一致
+import asyncio, threading, time
+import httpx
+import ini_op
+
+# 可重试的状态码和异常, 只重试未真正开始生成的请求
+RETRY_STATUS_CODES = {502, 503, 504}
+RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+class CircuitOpenError(httpx.TransportError):
+    """熔断期间直接拒绝请求时抛出的异常"""
+
+class CircuitBreaker:
+    """熔断器
+
+    连续失败 failure_threshold 次后进入熔断状态, reset_timeout 秒后放行一个探测请求,
+    探测成功则恢复, 失败则继续熔断。
+
+    Args:
+        failure_threshold: 触发熔断的连续失败次数
+        reset_timeout: 熔断持续时间(秒)
+    """
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def allow(self) -> bool:
+        """判断当前是否允许发出请求"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if self._probing else "open"
+
+class ResilientTransport(httpx.HTTPTransport):
+    """带重试退避和熔断的同步传输层, 连接池由 httpx 维护并保持长连接
+
+    Args:
+        breaker: 熔断器
+        max_retries: 最大重试次数
+        backoff: 初始退避时间(秒)
+        **kwargs: 透传给 httpx.HTTPTransport 的参数, 如 limits
+    """
+    def __init__(self, breaker: CircuitBreaker, max_retries: int, backoff: float, **kwargs):
+        super().__init__(**kwargs)
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.breaker.allow():
+            raise CircuitOpenError("Ollama服务熔断中, 请稍后重试", request=request)
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = super().handle_request(request)
+            except RETRY_EXCEPTIONS:
+                if last_attempt:
+                    self.breaker.record_failure()
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+            except httpx.TransportError:
+                self.breaker.record_failure()
+                raise
+            if response.status_code in RETRY_STATUS_CODES and not last_attempt:
+                response.close()
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return response
+
+class AsyncResilientTransport(httpx.AsyncHTTPTransport):
+    """带重试退避和熔断的异步传输层, 与同步传输层共享熔断器
+
+    Args:
+        breaker: 熔断器
+        max_retries: 最大重试次数
+        backoff: 初始退避时间(秒)
+        **kwargs: 透传给 httpx.AsyncHTTPTransport 的参数, 如 limits
+    """
+    def __init__(self, breaker: CircuitBreaker, max_retries: int, backoff: float, **kwargs):
+        super().__init__(**kwargs)
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.breaker.allow():
+            raise CircuitOpenError("Ollama服务熔断中, 请稍后重试", request=request)
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = await super().handle_async_request(request)
+            except RETRY_EXCEPTIONS:
+                if last_attempt:
+                    self.breaker.record_failure()
+                    raise
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+                continue
+            except httpx.TransportError:
+                self.breaker.record_failure()
+                raise
+            if response.status_code in RETRY_STATUS_CODES and not last_attempt:
+                await response.aclose()
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+                continue
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return response
+
+pool_size, connect_timeout, read_timeout, max_retries, retry_backoff, breaker_threshold, breaker_reset = ini_op.getinivalue(
+    'ollama_config', 'pool_size', 'connect_timeout', 'read_timeout', 'max_retries', 'retry_backoff', 'breaker_threshold', 'breaker_reset')
+
+# 同一进程内的Ollama客户端共用一个熔断器和连接池
+breaker = CircuitBreaker(int(breaker_threshold), float(breaker_reset))
+limits = httpx.Limits(max_connections=int(pool_size), max_keepalive_connections=int(pool_size))
+timeout = httpx.Timeout(float(read_timeout), connect=float(connect_timeout))
+transport = ResilientTransport(breaker, int(max_retries), float(retry_backoff), limits=limits)
+async_transport = AsyncResilientTransport(breaker, int(max_retries), float(retry_backoff), limits=limits)
+
+def client_kwargs():
+    """同步 ollama.Client 使用的参数"""
+    return {"timeout": timeout, "transport": transport}
+
+def async_client_kwargs():
+    """异步 ollama.AsyncClient 使用的参数"""
+    return {"timeout": timeout, "transport": async_transport}
@@ -0,0 +1,46 @@
+import re, fitz
+
+
+class PageClassifier:
+    """凭证PDF页面分类器
+
+    正则表达式在创建时编译一次。probe_ratio 在 0 到 1 之间时只提取页面顶部该比例区域的文字
+    判断关键字，页眉中找到凭证关键字但未匹配到日期或凭证号时再提取整页文字；为 0 时提取整页文字。
+    未变化文件的重复整理由 pdf_sortAndRename 的处理清单跳过，这里不缓存分类结果。
+    """
+
+    def __init__(self, ht_key, pz_key, pzrq_method, pzh_method, probe_ratio=0):
+        self.ht_key = ht_key
+        self.pz_key = pz_key
+        self.pzrq_re = re.compile(pzrq_method)
+        self.pzh_re = re.compile(pzh_method)
+        self.probe_ratio = probe_ratio
+
+    def pageText(self, page, full=False):
+        if full or not 0 < self.probe_ratio < 1:
+            return page.get_text("text")
+        rect = page.rect
+        clip = fitz.Rect(rect.x0, rect.y0, rect.x1, rect.y0 + rect.height * self.probe_ratio)
+        return page.get_text("text", clip=clip)
+
+    def classifyPage(self, page):
+        """返回 (是否包含合同关键字, 是否包含凭证关键字, 凭证日期, 凭证号)，未匹配到的值为 None"""
+        text = self.pageText(page)
+        is_pz = self.pz_key in text
+        if is_pz:
+            date_match = self.pzrq_re.search(text)
+            voucher_match = self.pzh_re.search(text)
+            if (date_match is None or voucher_match is None) and 0 < self.probe_ratio < 1:
+                text = self.pageText(page, full=True)
+                date_match = date_match or self.pzrq_re.search(text)
+                voucher_match = voucher_match or self.pzh_re.search(text)
+            return (self.ht_key in text, True,
+                date_match.group(1) if date_match else None, voucher_match.group(1) if voucher_match else None)
+        return (self.ht_key in text, False, None, None)
+
+    def classify(self, pdf_path, doc=None):
+        """返回文件每一页的分类结果列表，doc 为已打开的文档时直接使用"""
+        if doc is not None:
+            return [self.classifyPage(page) for page in doc]
+        with fitz.open(pdf_path) as doc:
+            return [self.classifyPage(page) for page in doc]
@@ -1,17 +1,73 @@
 from playwright._impl._errors import TimeoutError
-import pyautogui, pandas, ini_op, os, pdf_sortAndRename, sys
+from playwright.sync_api import sync_playwright
+import pyautogui, pandas, ini_op, rpa_login, os, pdf_sortAndRename, sys, threading, time, hashlib, requests
+from concurrent.futures import ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from time import strftime
 
-def run(llq, dwbh):
-    browser, context, page = llq
-    pz_list_file, pz_sheet, pz_no_head, pz_date_head, pdf_folder = ini_op.getinivalue('pdf_config', 
-        'pz_list_file', 'pz_sheet', 'pz_no_head', 'pz_date_head', 'pdf_folder')
+# 保存PDF依赖 ctrl+s 快捷键作用于当前激活的窗口，多个下载线程需依次执行
+save_lock = threading.Lock()
+
+# 已解析的凭证列表，按文件修改时间和大小判断是否需要重新读取
+voucher_cache = {}
+voucher_cache_lock = threading.Lock()
+
+def parseVoucherList(df, pz_date_head, pz_no_head, pz_dwbh_head):
+    """整列解析凭证列表，返回 (有效凭证, 无效行)
+
+    凭证日期统一为 YYYY-MM-DD（支持日期单元格以及 2024-3-5、2024/03/05、20240305、2024年3月5日 等文本），
+    凭证号去除首尾空格；日期无效、凭证号为空或（包含单位编号列时）单位编号为空的行不下载。
+    有效凭证去重后按日期排序，减少日期选择次数。
+    """
+    parts = df[pz_date_head].astype(str).str.strip().str.extract(r'^(\d{4})\D?(\d{1,2})\D?(\d{1,2})')
+    dates = pandas.to_datetime(parts[0] + '-' + parts[1].str.zfill(2) + '-' + parts[2].str.zfill(2), format='%Y-%m-%d', errors='coerce')
+    vouchers = pandas.DataFrame({'pzrq': dates.dt.strftime('%Y-%m-%d'), 'pzh': df[pz_no_head].astype(str).str.strip()}, index=df.index)
+    bad_date = dates.isna()
+    bad_no = df[pz_no_head].isna() | (vouchers['pzh'] == '')
+    bad_unit = pandas.Series(False, index=df.index)
+    if pz_dwbh_head in df.columns:
+        vouchers['dwbh'] = df[pz_dwbh_head].astype(str).str.strip()
+        # 单位编号为空的行无法归属到任何单位，按单位筛选时会被漏掉
+        bad_unit = df[pz_dwbh_head].isna() | (vouchers['dwbh'] == '')
+    bad = bad_date | bad_no | bad_unit
+    reason = pandas.Series('单位编号为空', index=df.index).mask(bad_no, '凭证号为空').mask(bad_date, '凭证日期无效')
+    rejected = pandas.DataFrame({'行号': df.index[bad] + 2, '原因': reason[bad]})
+    vouchers = vouchers[~bad].drop_duplicates()
+    vouchers = vouchers.sort_values(['pzrq', 'pzh'], kind='mergesort').reset_index(drop=True)
+    return vouchers, rejected
+
+def loadVoucherList(pz_list_file, pz_sheet, pz_date_head, pz_no_head, pz_dwbh_head):
+    """读取并解析凭证列表，文件未变化时直接使用缓存"""
+    stat = os.stat(pz_list_file)
+    key = (os.path.abspath(pz_list_file), pz_sheet, pz_date_head, pz_no_head, pz_dwbh_head)
+    with voucher_cache_lock:
+        cached = voucher_cache.get(key)
+    if cached and cached[0] == (stat.st_mtime_ns, stat.st_size):
+        return cached[1]
+    df = pandas.read_excel(pz_list_file, sheet_name=pz_sheet, dtype={pz_no_head: str, pz_dwbh_head: str})
+    result = parseVoucherList(df, pz_date_head, pz_no_head, pz_dwbh_head)
+    with voucher_cache_lock:
+        voucher_cache[key] = ((stat.st_mtime_ns, stat.st_size), result)
+    return result
+
+def readVoucherList():
+    """按配置读取凭证列表，返回 (有效凭证, 无效行)"""
+    pz_list_file, pz_sheet, pz_no_head, pz_date_head, pz_dwbh_head = ini_op.getinivalue('pdf_config',
+        'pz_list_file', 'pz_sheet', 'pz_no_head', 'pz_date_head', 'pz_dwbh_head')
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(sys.argv[0])))
-    timenow = str(strftime("%Y%m%d%H%M%S"))
-    pdf_folder = os.path.join(BASE_DIR, pdf_folder, timenow)
     if not os.path.isabs(pz_list_file):
         pz_list_file = os.path.join(BASE_DIR, pz_list_file)
-    os.makedirs(pdf_folder, exist_ok=True)
+    return loadVoucherList(pz_list_file, pz_sheet, pz_date_head, pz_no_head, pz_dwbh_head)
+
+def unitVouchers(vouchers, dwbh):
+    """凭证列表包含单位编号列时只保留 dwbh 单位的凭证"""
+    if 'dwbh' in vouchers.columns:
+        return vouchers[vouchers['dwbh'].str.zfill(len(dwbh)) == dwbh]
+    return vouchers
+
+def openPrintFrame(page, dwbh):
+    """打开联合打印页面并按单位编号筛选，返回页面所在的 frame"""
     page.click('#toolbar_header_function')
     page.fill('#search', '联合打印')
     try:
@@ -34,14 +90,102 @@ def run(llq, dwbh):
         frame.click('[for="lee-transfer-FSBZDJ_PZRQ"]')
         frame.click('.lee-transbtn-a')
         frame.click('.lee-dialog-btn-ok')
+    return frame
+
+class PdfFetcher:
+    """复用浏览器登录状态直接请求打印接口下载凭证PDF
+
+    Cookie 和 User-Agent 取自已登录的浏览器上下文，连接池保持长连接，
+    多个文件在后台线程中同时下载，下载后校验文件大小和PDF文件头。
+    """
+
+    def __init__(self, context, page, workers):
+        self.context = context
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers,
+            max_retries=Retry(total=3, backoff_factor=1, status_forcelist=[502, 503, 504]))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = page.evaluate('navigator.userAgent')
+        self.session.headers['Referer'] = page.url
+        self.executor = ThreadPoolExecutor(max_workers=workers)
 
-    global is_download, pzrq_now, pzh_now
-    is_download = True
-    def download(pzrq, pzh):
-        global is_download, pzrq_now, pzh_now
-        frame.fill('#FSBZDJ_PZH', pzh)
-        frame.fill('#FSBZDJ_ZZPZH', pzh)
+    def updateCookies(self):
+        """同步浏览器上下文中的最新Cookie，需在浏览器所在线程调用"""
+        for cookie in self.context.cookies():
+            self.session.cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'], path=cookie['path'])
 
+    def submit(self, url, pdf_path, on_saved=None):
+        self.updateCookies()
+        return self.executor.submit(self.fetch, url, pdf_path, on_saved)
+
+    def fetch(self, url, pdf_path, on_saved=None):
+        tmp_path = pdf_path + '.part'
+        sha256 = hashlib.sha256()
+        size = 0
+        with self.session.get(url, stream=True, timeout=(10, 600)) as response:
+            response.raise_for_status()
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+                    sha256.update(chunk)
+                    size += len(chunk)
+            expected = response.headers.get('Content-Length')
+        # 校验：大小与响应头一致、落盘大小与接收字节数一致、是PDF文件；哈希随日志输出，便于与服务端核对
+        with open(tmp_path, 'rb') as f:
+            is_pdf = f.read(5) == b'%PDF-'
+        if (expected is not None and int(expected) != size) or not is_pdf or os.path.getsize(tmp_path) != size:
+            os.remove(tmp_path)
+            raise IOError(f"凭证PDF下载不完整: {url}")
+        os.replace(tmp_path, pdf_path)
+        print(f"已下载 {pdf_path}，{size} 字节，sha256 {sha256.hexdigest()}")
+        if on_saved:
+            on_saved(pdf_path)
+        return pdf_path
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+class VoucherDownloader:
+    """在一个已登录的页面上逐个查询并下载凭证PDF
+
+    凭证按日期分组查询：日期变化时才重新选择日期并筛选出当天全部凭证，
+    同一天的凭证直接在筛选结果中点击打印，不在当前结果中时才按凭证号单独筛选，
+    之后同一天的凭证先恢复按日期筛选的列表，界面操作次数随不同日期的数量而不是凭证数量增长。
+    每次筛选等待该 frame 的列表数据请求返回，而不是根据分页栏文字判断。
+    每个凭证点击打印时绑定等待对应的打印响应，保存完成即进入下一个凭证，
+    并记录查询、打印、保存各阶段用时。on_saved 在每个PDF保存后以文件路径调用，
+    progress 用于向后台任务汇报每个凭证下载成功或失败。
+    """
+
+    def __init__(self, context, page, pdf_folder, on_saved=None, fetch_workers=0, progress=None):
+        self.context = context
+        self.page = page
+        self.pdf_folder = pdf_folder
+        self.on_saved = on_saved
+        self.frame = None
+        self.count = 0
+        self.timings = []
+        # fetch_workers 大于 0 时直接请求打印接口在后台下载，否则打开PDF预览页保存
+        self.fetcher = PdfFetcher(context, page, fetch_workers) if fetch_workers > 0 else None
+        self.futures = []
+        self.progress = progress
+        self.current_date = None
+        self.number_filtered = False
+        self.date_queries = 0
+        self.number_queries = 0
+        # 已完成下载（或已交给后台下载）的凭证数量，出错时其后的凭证记为失败
+        self.completed = 0
+
+    def open(self, dwbh):
+        self.frame = openPrintFrame(self.page, dwbh)
+        self.current_date = None
+        self.number_filtered = False
+
+    def selectDate(self, pzrq):
+        """在日期控件中把起止日期都设置为 pzrq"""
+        frame = self.frame
         frame.click('#FSBZDJ_PZRQ_1')
 
         frame.locator('span[lay-type="year"]').first.click()
@@ -49,7 +193,7 @@ def run(llq, dwbh):
         frame.locator('span[lay-type="month"]').first.click()
         frame.locator('li[lay-ym="'+str(int(pzrq[5:7])-1)+'"]').first.click()
         frame.locator('td[lay-ymd="'+pzrq[:5]+str(int(pzrq[5:7]))+'-'+str(int(pzrq[8:]))+'"]').first.click()
-        
+
         frame.locator('span[lay-type="year"]').last.click()
         frame.locator('li[lay-ym="'+pzrq[:4]+'"]').last.click()
         frame.locator('span[lay-type="month"]').last.click()
@@ -58,64 +202,247 @@ def run(llq, dwbh):
 
         frame.locator('.laydate-btns-confirm').click()
 
-        while True:
-            try:
-                frame.wait_for_selector('.lee-grid-pager-title span:text-matches("1")', timeout=5000)
-                break
-            except TimeoutError:
-                frame.click('.lee-solution-search button:text-matches("筛选")')
-        frame.wait_for_selector('td[id$=FSBZDJ_PZH] a[title="'+pzh+'"]', timeout=60000)
-
-        while True:
-            if is_download:
-                break
-            page.wait_for_timeout(1000)
-
-        pzrq_now = pzrq
-        pzh_now = pzh
-        while True:
-            frame.locator('td[id$=FSBZDJ_PZH] a[title="'+pzh+'"]').locator('../../../td[substring(@id, string-length(@id) - string-length("FSBZDJ_PZRQ") + 1) = "FSBZDJ_PZRQ"]').locator('div[title="'+pzrq+'"]').click()
-            frame.click('#toolbar1 span:text-matches("打印")')
+    def isGridResponse(self, response):
+        """本 frame 发出的列表数据请求"""
+        return response.frame == self.frame and response.request.resource_type in ('xhr', 'fetch')
+
+    def search(self, retries=3):
+        """点击筛选并等待本 frame 的列表数据返回，未返回时重新点击，最多 retries 次"""
+        for attempt in range(retries):
             try:
-                frame.wait_for_selector('.lee-message-top-center .lee-alert span:text-matches("请选中一条单据")', timeout=1000)
+                with self.page.expect_response(self.isGridResponse, timeout=10000):
+                    self.frame.click('.lee-solution-search button:text-matches("筛选")')
+                return
             except TimeoutError:
-                break
+                print(f"筛选后未返回列表数据，第 {attempt + 1} 次")
+        raise TimeoutError(f"筛选 {retries} 次均未返回列表数据")
+
+    def rowVisible(self, row):
+        """列表数据返回后表格渲染需要片刻，短暂等待凭证行出现"""
+        try:
+            self.frame.wait_for_selector(row, timeout=2000)
+            return True
+        except TimeoutError:
+            return False
 
-        while True:
-            if not is_download:
-                break
-            page.wait_for_timeout(1000)
+    def clearNumber(self):
+        self.frame.fill('#FSBZDJ_PZH', '')
+        self.frame.fill('#FSBZDJ_ZZPZH', '')
+        self.number_filtered = False
+
+    def query(self, pzrq, pzh):
+        """让凭证出现在列表中：日期变化时筛选当天全部凭证，当前列表中没有时再按凭证号筛选"""
+        frame = self.frame
+        row = 'td[id$=FSBZDJ_PZH] a[title="'+pzh+'"]'
+        if pzrq != self.current_date:
+            self.clearNumber()
+            self.selectDate(pzrq)
+            self.search()
+            self.current_date = pzrq
+            self.date_queries += 1
+        elif self.number_filtered:
+            # 上一个凭证按凭证号筛选后列表中只有该凭证，先恢复当天全部凭证的列表
+            self.clearNumber()
+            self.search()
+            self.date_queries += 1
+        if not self.rowVisible(row):
+            # 当天凭证较多时不一定都在第一页，按凭证号单独筛选（日期条件保持不变）
+            frame.fill('#FSBZDJ_PZH', pzh)
+            frame.fill('#FSBZDJ_ZZPZH', pzh)
+            self.search()
+            self.number_filtered = True
+            self.number_queries += 1
+        frame.wait_for_selector(row, timeout=60000)
+
+    @staticmethod
+    def isPrintResponse(response):
+        return "http://cpfms.casccloud.cn/api/BP/EIS/v1.0/imagedownload/print" in response.url and 'isBrowser' not in response.url
+
+    def download(self, pzrq, pzh):
+        frame, page = self.frame, self.page
+        start = time.perf_counter()
+        if self.progress:
+            self.progress.voucherStart(pzrq, pzh)
+        self.query(pzrq, pzh)
+        queried = time.perf_counter()
+
+        # 点击打印并等待该凭证的打印响应
+        with page.expect_response(self.isPrintResponse, timeout=600000) as response_info:
+            while True:
+                frame.locator('td[id$=FSBZDJ_PZH] a[title="'+pzh+'"]').locator('../../../td[substring(@id, string-length(@id) - string-length("FSBZDJ_PZRQ") + 1) = "FSBZDJ_PZRQ"]').locator('div[title="'+pzrq+'"]').click()
+                frame.click('#toolbar1 span:text-matches("打印")')
+                try:
+                    frame.wait_for_selector('.lee-message-top-center .lee-alert span:text-matches("请选中一条单据")', timeout=1000)
+                except TimeoutError:
+                    break
+        printed = time.perf_counter()
+
+        pdf_path = self.pdf_folder+'/'+pzrq[:8]+pzh+'.pdf'
+        if self.fetcher:
+            future = self.fetcher.submit(response_info.value.url, pdf_path, self.on_saved)
+            if self.progress:
+                future.add_done_callback(lambda f: self.progress.voucherFailed(pzrq, pzh, str(f.exception())) if f.exception() else self.progress.voucherDone(pzrq, pzh))
+            self.futures.append(future)
+        else:
+            self.savePdf(response_info.value.url, pdf_path)
+            if self.progress:
+                self.progress.voucherDone(pzrq, pzh)
+        saved = time.perf_counter()
         page.click('li.borderactive[title="联合打印"] a[id^=BILLPRINT] .nav-link-close')
 
+        timing = {'query': queried - start, 'print': printed - queried, 'save': saved - printed, 'total': time.perf_counter() - start}
+        self.timings.append(timing)
+        print(f"凭证 {pzrq} {pzh}：查询 {timing['query']:.1f} 秒，打印 {timing['print']:.1f} 秒，保存 {timing['save']:.1f} 秒")
 
-    
-    def handle_response(response):
-        global is_download, pzrq_now, pzh_now
-        if "http://cpfms.casccloud.cn/api/BP/EIS/v1.0/imagedownload/print" in response.url and 'isBrowser' not in response.url:
-            is_download = False
-            print(response.url)
-            pdf_page = context.new_page()
-            pdf_page.goto(response.url)
-            pdf_page.wait_for_timeout(2000)
+    def savePdf(self, url, pdf_path):
+        print(url)
+        pdf_page = self.context.new_page()
+        pdf_page.goto(url)
+        pdf_page.wait_for_timeout(2000)
+        with save_lock:
+            pdf_page.bring_to_front()
             with pdf_page.expect_download(timeout=600000) as download_info:
                 pyautogui.hotkey('ctrl', 's')
                 # pdf_page.locator('#viewer').down('Control')
                 # pdf_page.locator('#viewer').press('s')
                 # pdf_page.locator('#viewer').up('Control')
-            download = download_info.value
-            download.save_as(pdf_folder+'/'+pzrq_now[:8]+pzh_now+'.pdf')
-            pdf_page.close()
-            is_download = True
-
-    page.on('response', handle_response)
-
-    df = pandas.read_excel(pz_list_file, sheet_name=pz_sheet)
-    for index, row in df.iterrows():
-        download(row[pz_date_head], row[pz_no_head])
-    while True:
-        if is_download:
-            break
-        page.wait_for_timeout(1000)
-    
-    pdf_sortAndRename.run(timenow)
-    return timenow
\ No newline at end of file
+        download = download_info.value
+        download.save_as(pdf_path)
+        if self.on_saved:
+            self.on_saved(pdf_path)
+        pdf_page.close()
+        self.count += 1
+
+    def run(self, rows):
+        """依次下载 rows 中的 (凭证日期, 凭证号)，返回 (下载数量, 用时秒数, 各凭证阶段用时)
+
+        rows 需按日期排序，同一天的凭证只筛选一次日期。
+        """
+        start = time.perf_counter()
+        try:
+            for pzrq, pzh in rows:
+                self.download(pzrq, pzh)
+                self.completed += 1
+        finally:
+            if self.fetcher:
+                # 等待后台下载完成，下载出错时同样关闭连接和线程池
+                wait(self.futures)
+                self.fetcher.close()
+        print(f"{len(rows)} 个凭证共按日期筛选 {self.date_queries} 次，按凭证号筛选 {self.number_queries} 次")
+        if self.fetcher:
+            for future in self.futures:
+                if future.exception() is None:
+                    self.count += 1
+                else:
+                    print(f"下载失败: {future.exception()}")
+        return self.count, time.perf_counter() - start, self.timings
+
+def failRows(progress, rows, error):
+    """下载出错时把未完成的凭证记为失败"""
+    if progress:
+        for pzrq, pzh in rows:
+            progress.voucherFailed(pzrq, pzh, str(error))
+
+def downloadWorker(storage_state, start_url, dwbh, rows, pdf_folder, on_saved, fetch_workers, progress):
+    """下载线程：用已登录的会话状态打开独立浏览器，下载分配到的凭证，返回 VoucherDownloader.run 的结果
+
+    出错时把未完成的凭证记为失败后重新抛出异常。
+    """
+    downloader = None
+    try:
+        with sync_playwright() as playwright:
+            browser = rpa_login.launchBrowser(playwright, slow_mo=0)
+            try:
+                context = rpa_login.newContext(browser, storage_state)
+                page = context.new_page()
+                page.goto(start_url)
+                page.wait_for_selector('#toolbar_header_function', timeout=60000)
+                downloader = VoucherDownloader(context, page, pdf_folder, on_saved, fetch_workers, progress)
+                downloader.open(dwbh)
+                return downloader.run(rows)
+            finally:
+                browser.close()
+    except Exception as e:
+        failRows(progress, rows[downloader.completed if downloader else 0:], e)
+        raise
+
+def shardRows(rows, workers):
+    """把按日期排序的凭证分给多个下载线程，同一天的凭证分到同一线程，各线程凭证数量尽量平均"""
+    groups = {}
+    for pzrq, pzh in rows:
+        groups.setdefault(pzrq, []).append((pzrq, pzh))
+    shards = [[] for i in range(workers)]
+    for group in sorted(groups.values(), key=len, reverse=True):
+        min(shards, key=len).extend(group)
+    return [sorted(shard) for shard in shards]
+
+def printStats(stats):
+    for index, (count, elapsed, timings) in enumerate(stats):
+        speed = count / elapsed * 60 if elapsed else 0
+        print(f"下载线程{index + 1}：下载 {count} 个凭证，用时 {elapsed:.1f} 秒，{speed:.1f} 个/分钟")
+        if timings:
+            average = {phase: sum(timing[phase] for timing in timings) / len(timings) for phase in timings[0]}
+            print(f"    平均每个凭证：查询 {average['query']:.1f} 秒，打印 {average['print']:.1f} 秒，保存 {average['save']:.1f} 秒，合计 {average['total']:.1f} 秒")
+
+def run(llq, dwbh, progress=None, timenow=None, sort_workers=None):
+    """下载并整理 dwbh 单位的凭证，timenow 为输出子文件夹（默认当前时间），返回该子文件夹
+
+    sort_workers 为整理进程数，为空时按配置。
+    """
+    browser, context, page = llq
+    pdf_folder, download_workers, fetch_workers = ini_op.getinivalue('pdf_config', 'pdf_folder', 'download_workers', 'fetch_workers')
+    fetch_workers = int(fetch_workers)
+    BASE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(sys.argv[0])))
+    timenow = timenow or str(strftime("%Y%m%d%H%M%S"))
+    pdf_folder = os.path.join(BASE_DIR, pdf_folder, timenow)
+    os.makedirs(pdf_folder, exist_ok=True)
+    # 下载的凭证PDF交给后台进程池边下载边整理
+    pipeline = pdf_sortAndRename.SortPipeline(timenow, progress.fileSorted if progress else None, sort_workers)
+
+    try:
+        vouchers, rejected = readVoucherList()
+        if len(rejected):
+            print(f"凭证列表中有 {len(rejected)} 行无效，不下载：")
+            print(rejected.head(20).to_string(index=False))
+            if progress:
+                progress.emit('rejected', count=len(rejected), rows=rejected['行号'].head(100).tolist())
+        # 凭证列表包含单位编号列时只下载当前单位的凭证
+        vouchers = unitVouchers(vouchers, dwbh)
+        rows = list(zip(vouchers['pzrq'], vouchers['pzh']))
+        if progress:
+            progress.addTotal(len(rows))
+        # 同一天的凭证由同一个线程下载，线程数不超过不同日期的数量
+        download_workers = max(1, min(int(download_workers), len(set(pzrq for pzrq, pzh in rows))))
+        errors = []
+        if download_workers == 1:
+            downloader = VoucherDownloader(context, page, pdf_folder, pipeline.submit, fetch_workers, progress)
+            try:
+                downloader.open(dwbh)
+                stats = [downloader.run(rows)]
+            except Exception as e:
+                failRows(progress, rows[downloader.completed:], e)
+                raise
+        else:
+            # 多个下载线程共享当前页面的登录状态，各自打开浏览器并分摊凭证
+            storage_state = context.storage_state()
+            shards = shardRows(rows, download_workers)
+            with ThreadPoolExecutor(max_workers=download_workers) as executor:
+                futures = [executor.submit(downloadWorker, storage_state, page.url, dwbh, shards[i], pdf_folder,
+                    pipeline.submit, fetch_workers, progress) for i in range(download_workers)]
+            stats = []
+            for index, future in enumerate(futures):
+                try:
+                    stats.append(future.result())
+                except Exception as e:
+                    # 其他线程已下载的凭证照常整理合并，最后再报告失败
+                    stats.append((0, 0, []))
+                    errors.append(f"下载线程{index + 1}（{len(shards[index])} 个凭证）：{e!r}")
+        printStats(stats)
+
+        # 等待后台整理完成并合并联合打印.pdf
+        pipeline.finish()
+        if errors:
+            raise RuntimeError("部分下载线程失败，未完成的凭证已记为失败：" + "；".join(errors))
+    finally:
+        pipeline.close()
+    return timenow
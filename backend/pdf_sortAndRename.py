@@ -1,7 +1,10 @@
-import os, fitz, re, ini_op, sys 
+import os, fitz, ini_op, sys, json, hashlib, threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pdf_classifier import PageClassifier
 
 
-def sortAndRename(pdf_path, output_folder, ht_key, pz_key, pzrq_method, pzh_method, keep_ht, hb_doc):
+def sortAndRename(pdf_path, output_folder, classifier, keep_ht):
     doc = fitz.open()
     new_doc = fitz.open(pdf_path)
     ht_pages = []
@@ -13,26 +16,17 @@ def sortAndRename(pdf_path, output_folder, ht_key, pz_key, pzrq_method, pzh_meth
     is_ht_page = False
     is_pz_page = False
     # 遍历PDF每一页，寻找包含关键词的页
-    for i in range(len(new_doc)):
-        text = new_doc[i].get_text("text")
-        if ht_key in text:
+    for i, (has_ht, has_pz, page_date, page_voucher) in enumerate(classifier.classify(pdf_path, new_doc)):
+        if has_ht:
             is_ht_page = True
         # 处理凭证页
-        if pz_key in text:
+        if has_pz:
             is_ht_page = False
             is_pz_page = True
             pz_pages.append(i)
-            # 正则匹配日期与凭证号
-            date_pattern = pzrq_method
-            voucher_pattern = pzh_method
-
-            # 提取匹配的内容
-            date_match = re.search(date_pattern, text)
-            voucher_match = re.search(voucher_pattern, text)
-
-            # 获取匹配的值
-            date_value = date_match.group(1) if date_match else "未找到日期"
-            voucher_value = voucher_match.group(1) if voucher_match else "未找到凭证号"
+            # 获取匹配的日期与凭证号
+            date_value = page_date if page_date else "未找到日期"
+            voucher_value = page_voucher if page_voucher else "未找到凭证号"
         elif is_ht_page:
             ht_pages.append(i)
         elif is_pz_page:
@@ -46,7 +40,6 @@ def sortAndRename(pdf_path, output_folder, ht_key, pz_key, pzrq_method, pzh_meth
         all_pages = pz_pages + other_pages
     for page_idx in all_pages:
         doc.insert_pdf(new_doc, from_page=page_idx, to_page=page_idx)
-        hb_doc.insert_pdf(new_doc, from_page=page_idx, to_page=page_idx)
     #保存新pdf
     if date_value == '未找到凭证页':
         output_path = os.path.join(output_folder, f"{os.path.basename(pdf_path)[:-4]}('未找到凭证页').pdf")
@@ -56,27 +49,234 @@ def sortAndRename(pdf_path, output_folder, ht_key, pz_key, pzrq_method, pzh_meth
     new_doc.close()
     doc.close()
     print(f"处理完成，新的PDF已保存至 {output_path}")
-    return hb_doc
+    return output_path, all_pages, date_value, voucher_value
+
+def pageRefs(doc, xref):
+    """页面树节点 Kids 中各子节点的xref"""
+    return [int(ref) for ref in doc.xref_get_key(xref, 'Kids')[1].strip('[]').split()[::3]]
+
+def groupNewPages(doc, added):
+    """把最后追加的 added 页移到根节点下新建的中间节点
+
+    合并文件的根节点下每块页面一个中间节点，MuPDF 追加页面时查找末页只需遍历根节点和最后一块，
+    不必扫描全部页面。
+    """
+    root = int(doc.xref_get_key(doc.pdf_catalog(), 'Pages')[1].split()[0])
+    root_kids = pageRefs(doc, root)
+    node = root_kids[-1] if doc.xref_get_key(root_kids[-1], 'Type')[1] == '/Pages' else root
+    kids = pageRefs(doc, node)
+    kept, moved = kids[:-added], kids[-added:]
+    group = doc.get_new_xref()
+    doc.update_object(group, '<</Type/Pages/Kids[%s]/Count %d/Parent %d 0 R>>' % (
+        ' '.join(f'{xref} 0 R' for xref in moved), len(moved), root))
+    for xref in moved:
+        doc.xref_set_key(xref, 'Parent', f'{group} 0 R')
+    if node == root:
+        root_kids = kept
+    else:
+        doc.xref_set_key(node, 'Kids', '[%s]' % ' '.join(f'{xref} 0 R' for xref in kept))
+        doc.xref_set_key(node, 'Count', str(len(kept)))
+    doc.xref_set_key(root, 'Kids', '[%s]' % ' '.join(f'{xref} 0 R' for xref in root_kids + [group]))
+
+def appendChunk(merge_path, chunk_doc, first):
+    """把一块页面追加到磁盘上的合并文件，只重新打开合并文件一次"""
+    if first:
+        groupNewPages(chunk_doc, len(chunk_doc))
+        chunk_doc.save(merge_path)
+        return
+    merge_doc = fitz.open(merge_path)
+    # 复制链接需要加载合并文件的全部页面对象，这一块没有链接时跳过
+    merge_doc.insert_pdf(chunk_doc, links=any(page.first_link for page in chunk_doc))
+    groupNewPages(merge_doc, len(chunk_doc))
+    merge_doc.save(merge_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+    merge_doc.close()
 
-def run(timenow):
-    pdf_folder, output_folder, ht_key, pz_key, pzrq_method, pzh_method, keep_ht = ini_op.getinivalue("pdf_config", 
-        "pdf_folder", "output_folder", "ht_key", "pz_key", "pzrq_method", "pzh_method", "keep_ht")
+def mergePdf(merge_path, sources, chunk_pages):
+    """按顺序合并各凭证整理后的页面
+
+    sources 为 (原始pdf路径, 页码列表) 的序列。chunk_pages 大于 0 时每累计 chunk_pages 页先在一个小文档中拼好，
+    再整块追加到磁盘上的合并文件并以增量方式保存，峰值内存和每块的耗时基本不随总页数增长；
+    为 0 时整体在内存中合并后保存。同一凭证的各页共用一个 graft map，字体等共享资源只复制一次。
+    """
+    hb_doc = fitz.open()
+    saved = False
+    for pdf_path, all_pages in sources:
+        new_doc = fitz.open(pdf_path)
+        for i, page_idx in enumerate(all_pages):
+            hb_doc.insert_pdf(new_doc, from_page=page_idx, to_page=page_idx, final=i == len(all_pages) - 1)
+            if chunk_pages and len(hb_doc) >= chunk_pages:
+                appendChunk(merge_path, hb_doc, not saved)
+                saved = True
+                hb_doc.close()
+                hb_doc = fitz.open()
+        new_doc.close()
+    if not saved:
+        hb_doc.save(merge_path)
+    elif len(hb_doc):
+        appendChunk(merge_path, hb_doc, False)
+    hb_doc.close()
+    return merge_path
+
+def fileHash(file_path):
+    """计算文件内容的sha256"""
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def loadManifest(manifest_path):
+    """读取处理清单，每行一条记录，同一文件以最后一条为准"""
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # 中途崩溃可能留下不完整的最后一行
+                    continue
+                manifest[entry['file']] = entry
+    return manifest
+
+def saveManifest(manifest_path, entries):
+    """整理清单，只保留当前每个文件的最新记录"""
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    os.replace(tmp_path, manifest_path)
+
+def sortFiles(sort_pdf, pdf_paths, sort_workers):
+    """按输入顺序逐个返回整理结果，sort_workers 大于 1 时多进程并行整理"""
+    if sort_workers > 1 and len(pdf_paths) > 1:
+        sort_workers = min(sort_workers, len(pdf_paths))
+        with ProcessPoolExecutor(max_workers=sort_workers) as executor:
+            yield from executor.map(sort_pdf, pdf_paths, chunksize=max(1, len(pdf_paths) // (sort_workers * 4)))
+    else:
+        for pdf_path in pdf_paths:
+            yield sort_pdf(pdf_path)
+
+def loadConfig(timenow, sort_workers=None):
+    """读取整理配置，返回输入输出文件夹、单文件整理函数、配置指纹、并行进程数和合并分块页数
+
+    sort_workers 不为空时代替配置中的并行进程数，批量归档时由各单位分摊CPU核心。
+    """
+    pdf_folder, output_folder, ht_key, pz_key, pzrq_method, pzh_method, keep_ht, configured_workers, merge_chunk_pages, probe_ratio = ini_op.getinivalue("pdf_config", 
+        "pdf_folder", "output_folder", "ht_key", "pz_key", "pzrq_method", "pzh_method", "keep_ht", "sort_workers", "merge_chunk_pages", "probe_ratio")
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(sys.argv[0])))
     pdf_folder = os.path.join(BASE_DIR, pdf_folder, timenow)
     output_folder = os.path.join(BASE_DIR, output_folder, timenow)
     os.makedirs(pdf_folder, exist_ok=True)
     os.makedirs(output_folder, exist_ok=True)
     keep_ht = keep_ht == 'True'
-    # 遍历PDF文件夹
-    file_list = os.listdir(pdf_folder)
-    hb_doc = fitz.open()
-    for file in file_list:
-        if file.endswith(".pdf"):
-            pdf_path = os.path.join(pdf_folder, file)
-            hb_doc = sortAndRename(pdf_path, output_folder, ht_key, pz_key, pzrq_method, pzh_method, keep_ht, hb_doc)
-    hb_doc.save(os.path.join(output_folder, "联合打印.pdf"))
+    classifier = PageClassifier(ht_key, pz_key, pzrq_method, pzh_method, float(probe_ratio))
+    sort_pdf = partial(sortAndRename, output_folder=output_folder, classifier=classifier, keep_ht=keep_ht)
+    settings = hashlib.sha256(json.dumps([ht_key, pz_key, pzrq_method, pzh_method, keep_ht, probe_ratio]).encode('utf-8')).hexdigest()
+    # sort_workers 为 0 时使用全部CPU核心，为 1 时逐个处理
+    sort_workers = sort_workers or int(configured_workers) or os.cpu_count() or 1
+    return pdf_folder, output_folder, sort_pdf, settings, sort_workers, int(merge_chunk_pages)
+
+def manifestEntry(pdf_path, sha256, settings, result):
+    """根据整理结果生成处理清单记录"""
+    output_path, all_pages, date_value, voucher_value = result
+    return {'file': os.path.basename(pdf_path), 'sha256': sha256, 'settings': settings,
+        'date': date_value, 'voucher': voucher_value, 'output': os.path.basename(output_path), 'pages': all_pages}
+
+def run(timenow, sort_workers=None):
+    pdf_folder, output_folder, sort_pdf, settings, sort_workers, merge_chunk_pages = loadConfig(timenow, sort_workers)
+    # 遍历PDF文件夹，按文件名排序保证合并顺序固定
+    pdf_paths = [os.path.join(pdf_folder, file) for file in sorted(os.listdir(pdf_folder)) if file.endswith(".pdf")]
+    # 处理清单记录每个输入文件的内容哈希和整理结果，重新运行时跳过未变化的文件
+    manifest_path = os.path.join(output_folder, "manifest.jsonl")
+    manifest = loadManifest(manifest_path)
+    entries = {}
+    todo = []
+    for pdf_path in pdf_paths:
+        file = os.path.basename(pdf_path)
+        sha256 = fileHash(pdf_path)
+        entry = manifest.get(file)
+        if entry and entry['sha256'] == sha256 and entry['settings'] == settings \
+                and os.path.exists(os.path.join(output_folder, entry['output'])):
+            entries[file] = entry
+        else:
+            todo.append((pdf_path, sha256))
+    print(f"跳过未变化的文件 {len(entries)} 个，待处理 {len(todo)} 个")
+    # 多进程并行整理
+    with open(manifest_path, 'a', encoding='utf-8') as manifest_file:
+        results = sortFiles(sort_pdf, [pdf_path for pdf_path, sha256 in todo], sort_workers)
+        for (pdf_path, sha256), result in zip(todo, results):
+            entry = manifestEntry(pdf_path, sha256, settings, result)
+            # 每处理完一个文件立即追加记录，中途崩溃后可从断点继续
+            manifest_file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            manifest_file.flush()
+            entries[entry['file']] = entry
+    saveManifest(manifest_path, [entries[os.path.basename(pdf_path)] for pdf_path in pdf_paths])
+    if not pdf_paths:
+        print("没有需要合并的凭证PDF")
+        return
+    # 按输入文件顺序合并所有凭证页面，分块写入磁盘
+    mergePdf(os.path.join(output_folder, "联合打印.pdf"),
+        [(pdf_path, entries[os.path.basename(pdf_path)]['pages']) for pdf_path in pdf_paths], merge_chunk_pages)
     # print(f"处理完成，合并PDF已保存至 {os.path.join(output_folder, "联合打印.pdf")}")
 
+class SortPipeline:
+    """边下载边整理
+
+    下载线程每保存一个凭证PDF就调用 submit 交给后台进程池整理，整理结果写入处理清单；
+    全部下载完成后调用 finish 等待整理结束，再由 run 补齐遗漏的文件并合并联合打印.pdf。
+    下载出错时调用 close 取消未开始的整理并关闭清单，已整理的记录保留，下次运行时跳过。
+    on_sorted 在每个文件整理完成后以 (文件路径, 整理结果) 调用，sort_workers 为空时按配置启动进程池。
+    """
+
+    def __init__(self, timenow, on_sorted=None, sort_workers=None):
+        self.timenow = timenow
+        self.on_sorted = on_sorted
+        pdf_folder, output_folder, self.sort_pdf, self.settings, self.sort_workers, merge_chunk_pages = loadConfig(timenow, sort_workers)
+        self.executor = ProcessPoolExecutor(max_workers=self.sort_workers)
+        self.manifest_file = open(os.path.join(output_folder, "manifest.jsonl"), 'a', encoding='utf-8')
+        self.lock = threading.Lock()
+        self.futures = []
+
+    def submit(self, pdf_path):
+        sha256 = fileHash(pdf_path)
+        future = self.executor.submit(self.sort_pdf, pdf_path)
+        future.add_done_callback(lambda f: self.record(pdf_path, sha256, f))
+        self.futures.append(future)
+        return future
+
+    def record(self, pdf_path, sha256, future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            # 整理失败的文件由 finish 中的 run 重新处理
+            print(f"整理失败 {pdf_path}: {future.exception()}")
+            return
+        entry = manifestEntry(pdf_path, sha256, self.settings, future.result())
+        with self.lock:
+            if self.manifest_file.closed:
+                return
+            self.manifest_file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self.manifest_file.flush()
+        if self.on_sorted:
+            self.on_sorted(pdf_path, future.result())
+
+    def finish(self):
+        self.executor.shutdown(wait=True)
+        with self.lock:
+            self.manifest_file.close()
+        run(self.timenow, self.sort_workers)
+        return self.timenow
+
+    def close(self):
+        """停止整理并关闭清单，可在 finish 之后重复调用"""
+        # 后端打包的 Python 3.7 不支持 shutdown(cancel_futures=True)，逐个取消尚未开始的任务
+        for future in self.futures:
+            future.cancel()
+        self.executor.shutdown(wait=True)
+        with self.lock:
+            self.manifest_file.close()
+
 if __name__ == "__main__":
     timenow = '20250317174820'
     run(timenow)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import threading, queue, json
+
+class EventBus:
+    """RPA进度事件的发布/订阅
+
+    没有订阅者时 publish 直接返回，下载和整理过程中随处发布事件也几乎没有开销；
+    订阅者各自持有一个有界队列，前端处理不过来时丢弃最旧的事件，不会阻塞下载线程。
+    """
+
+    def __init__(self, max_queue=1000):
+        self.max_queue = max_queue
+        self.lock = threading.Lock()
+        self.subscribers = []
+
+    def active(self):
+        return bool(self.subscribers)
+
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=self.max_queue)
+        with self.lock:
+            self.subscribers = self.subscribers + [subscriber]
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers = [s for s in self.subscribers if s is not subscriber]
+
+    def publish(self, event):
+        # 订阅列表整体替换，读取时无需加锁
+        for subscriber in self.subscribers:
+            while True:
+                try:
+                    subscriber.put_nowait(event)
+                    break
+                except queue.Full:
+                    try:
+                        subscriber.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def stream(self, job_id=None, heartbeat=15):
+        """生成SSE数据帧，job_id 不为空时只输出该任务的事件"""
+        subscriber = self.subscribe()
+        try:
+            while True:
+                try:
+                    event = subscriber.get(timeout=heartbeat)
+                except queue.Empty:
+                    # 定时发送注释行保持连接，客户端断开时在此处结束
+                    yield ": heartbeat\n\n"
+                    continue
+                if job_id is None or event.get('job') == job_id:
+                    yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+bus = EventBus()
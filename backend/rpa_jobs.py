@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+import ini_op, duckdb, rpa_events, threading, time, uuid, os, sys
+from concurrent.futures import ThreadPoolExecutor
+from time import strftime
+
+BASE_DIR = os.path.dirname(os.path.realpath(sys.argv[0]))
+
+class Progress:
+    """记录一个任务的凭证下载进度，可在多个下载线程中调用
+
+    每个凭证开始、完成、失败以及整理结果都会发布到 rpa_events.bus，供前端通过SSE订阅。
+    """
+
+    def __init__(self, job_id=None):
+        self.job_id = job_id
+        self.lock = threading.Lock()
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.started = None
+
+    def emit(self, event_type, **data):
+        if not rpa_events.bus.active():
+            return
+        event = {'job': self.job_id, 'type': event_type}
+        event.update(data)
+        event.update(self.snapshot())
+        rpa_events.bus.publish(event)
+
+    def addTotal(self, total):
+        """增加待下载凭证数量，批量任务中每个单位开始时调用一次"""
+        with self.lock:
+            self.total += total
+            self.started = self.started or time.time()
+        self.emit('start')
+
+    def voucherStart(self, pzrq, pzh):
+        self.emit('voucher_start', pzrq=pzrq, pzh=pzh)
+
+    def voucherDone(self, pzrq=None, pzh=None):
+        with self.lock:
+            self.done += 1
+        self.emit('voucher_done', pzrq=pzrq, pzh=pzh)
+
+    def voucherFailed(self, pzrq=None, pzh=None, error=None):
+        with self.lock:
+            self.failed += 1
+        self.emit('voucher_failed', pzrq=pzrq, pzh=pzh, error=error)
+
+    def fileSorted(self, pdf_path, result):
+        output_path, pages, date_value, voucher_value = result
+        self.emit('sorted', file=os.path.basename(pdf_path), output=os.path.basename(output_path),
+                  pages=pages, date=date_value, voucher=voucher_value)
+
+    def snapshot(self):
+        with self.lock:
+            elapsed = time.time() - self.started if self.started else 0
+            finished = self.done + self.failed
+            # 按已完成凭证的平均速度估算剩余时间
+            eta = round(elapsed / finished * (self.total - finished), 1) if finished else None
+            return {'total': self.total, 'done': self.done, 'failed': self.failed,
+                    'per_minute': round(self.done / elapsed * 60, 2) if elapsed else 0, 'eta_seconds': eta}
+
+class Job:
+    def __init__(self, job_id, name):
+        self.id = job_id
+        self.name = name
+        self.status = 'queued'
+        self.submitted = strftime("%Y-%m-%d %H:%M:%S")
+        self.started = None
+        self.finished = None
+        self.file_path = None
+        self.error = None
+        self.progress = Progress(job_id)
+
+    def toDict(self):
+        data = {'id': self.id, 'name': self.name, 'status': self.status, 'submitted': self.submitted,
+                'started': self.started, 'finished': self.finished, 'filePath': self.file_path, 'error': self.error}
+        data.update(self.progress.snapshot())
+        return data
+
+class JobManager:
+    """RPA后台任务队列
+
+    提交任务后立即返回任务编号，由固定数量的工作线程依次执行；
+    任务状态变化时写入 rpadata.db 的 rpa_jobs 表，重启后仍可查询历史任务。
+    内存中只保留排队和执行中的任务。
+    """
+
+    def __init__(self, db_path='rpadata.db'):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.executor = None
+
+    def connect(self):
+        conn = duckdb.connect(self.db_path)
+        conn.execute("""create table if not exists rpa_jobs (
+            id varchar primary key, name varchar, status varchar, submitted varchar, started varchar, finished varchar,
+            total integer, done integer, failed integer, per_minute double, file_path varchar, error varchar)""")
+        return conn
+
+    def start(self):
+        """创建工作线程，并把上次退出时未完成的任务标记为中断；应用启动时调用"""
+        with self.lock:
+            if self.executor:
+                return
+            job_workers = ini_op.getinivalue('basic_config', 'job_workers')[0]
+            self.executor = ThreadPoolExecutor(max_workers=max(int(job_workers), 1), thread_name_prefix='rpa-job')
+            # 上次退出时未完成的任务不会再执行
+            conn = self.connect()
+            conn.execute("update rpa_jobs set status = 'interrupted' where status in ('queued', 'running')")
+            conn.close()
+
+    def save(self, job, status=None):
+        """写入任务记录，status 不为空时以其作为记录的状态"""
+        data = job.toDict()
+        if status:
+            data['status'] = status
+        with self.lock:
+            conn = self.connect()
+            conn.execute("insert or replace into rpa_jobs values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [data['id'], data['name'], data['status'], data['submitted'], data['started'], data['finished'],
+                 data['total'], data['done'], data['failed'], data['per_minute'], data['filePath'], data['error']])
+            conn.close()
+
+    def submit(self, name, func):
+        """提交任务，func 接收 Progress 对象，返回输出文件路径；返回任务编号"""
+        self.start()
+        job = Job(uuid.uuid4().hex, name)
+        with self.lock:
+            self.jobs[job.id] = job
+        self.save(job)
+        self.executor.submit(self.execute, job, func)
+        return job.id
+
+    def execute(self, job, func):
+        job.status = 'running'
+        job.started = strftime("%Y-%m-%d %H:%M:%S")
+        self.save(job)
+        try:
+            file_path, status, error = func(job.progress), 'finished', None
+        except Exception as e:
+            file_path, status, error = None, 'failed', str(e)
+        job.file_path, job.error = file_path, error
+        job.finished = strftime("%Y-%m-%d %H:%M:%S")
+        # 先写入历史记录再从内存中移除，内存中只保留未结束的任务，结束的任务从历史记录中查询
+        self.save(job, status)
+        with self.lock:
+            job.status = status
+            del self.jobs[job.id]
+        job.progress.emit(job.status, filePath=job.file_path, error=job.error)
+
+    def query(self, sql, params):
+        with self.lock:
+            conn = self.connect()
+            cursor = conn.execute(sql, params)
+            columns = ['filePath' if column[0] == 'file_path' else column[0] for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            conn.close()
+        return rows
+
+    def get(self, job_id):
+        """查询任务状态，当前进程中没有的任务从历史记录中读取"""
+        job = self.jobs.get(job_id)
+        if job:
+            return job.toDict()
+        rows = self.query("select * from rpa_jobs where id = ?", [job_id])
+        return rows[0] if rows else None
+
+    def history(self, limit=50):
+        return self.query("select * from rpa_jobs order by submitted desc limit ?", [limit])
+
+job_manager = JobManager()
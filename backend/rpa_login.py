@@ -1,52 +1,37 @@
 # -*- coding: utf-8 -*-
-import pyautogui, ini_op, os, sys
+import pyautogui, ini_op, os, sys, json, hashlib, base64, tempfile
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
 
-def run(playwright, browserMethod, contextMethod, pageMethod):
-    chrome_port, login_way, net, url, username, password, is_zsxz = ini_op.getinivalue('basic_config', 'chrome_port', 'login_way', 'smw_net', 'nw_net', 'gscloud_username', 'gscloud_password', 'is_zsxz')
+def isHeadless():
+    # CA登录需要在浏览器中选择证书，只能使用有界面的浏览器
+    login_way, headless = ini_op.getinivalue('basic_config', 'login_way', 'headless')
+    return headless == 'True' and login_way != 'CA登录'
+
+def launchBrowser(playwright, slow_mo=50):
+    """启动浏览器，无界面模式下不设置 slow_mo"""
+    BASE_DIR = os.path.dirname(os.path.realpath(sys.argv[0]))
+    browser_path = os.path.join(BASE_DIR, 'Browser Data')
+    os.makedirs(browser_path, exist_ok=True)
+    if isHeadless():
+        return playwright.chromium.launch(headless=True)
+    return playwright.chromium.launch(headless=False, slow_mo=slow_mo, args=['--start-maximized'])
+
+def newContext(browser, storage_state=None):
+    return browser.new_context(storage_state=storage_state, ignore_https_errors=True, accept_downloads=True, no_viewport=not isHeadless())
+
+def login(page):
+    """在指定页面完成登录，返回时已进入系统首页"""
+    login_way, net, url, username, password, is_zsxz = ini_op.getinivalue('basic_config', 'login_way', 'smw_net', 'nw_net', 'gscloud_username', 'gscloud_password', 'is_zsxz')
     if login_way == '账号密码登录':
-        if browserMethod == 'new_browser':
-            BASE_DIR = os.path.dirname(os.path.realpath(sys.argv[0]))
-            browser_path = os.path.join(BASE_DIR, 'Browser Data')
-            os.makedirs(browser_path, exist_ok=True)
-            browser = playwright.chromium.launch(headless=False, slow_mo=50, args=['--start-maximized'])
-            context = browser.new_context(ignore_https_errors=True, accept_downloads=True, no_viewport=True)
-            page = context.new_page()
-        else:
-            browser = playwright.chromium.connect_over_cdp('http://localhost:'+chrome_port)
-            if contextMethod == 'new_context':
-                context = browser.new_context(ignore_https_errors=True, accept_downloads=True, no_viewport=True)
-                page = context.new_page()
-            else:
-                context = browser.contexts[0]
-                if pageMethod == 'new_page':
-                    page = context.new_page()
-                else:
-                    page = context.pages[0]
         page.goto(net)
         page.fill('#userName', username)
         page.fill('#passWord', password)
         page.locator('#login').first.click()
         page.wait_for_selector('#toolbar_header_function', timeout=600000)
-        return [browser, context, page]
     elif login_way == 'CA登录':
-        if browserMethod == 'new_browser':
-            BASE_DIR = os.path.dirname(os.path.realpath(sys.argv[0]))
-            browser_path = os.path.join(BASE_DIR, 'Browser Data')
-            os.makedirs(browser_path, exist_ok=True)
-            browser = playwright.chromium.launch(headless=False, slow_mo=50, args=['--start-maximized'])
-            context = browser.new_context(ignore_https_errors=True, accept_downloads=True, no_viewport=True)
-            page = context.new_page()
-        else:
-            browser = playwright.chromium.connect_over_cdp('http://localhost:'+chrome_port)
-            if contextMethod == 'new_context':
-                context = browser.new_context(ignore_https_errors=True, accept_downloads=True, no_viewport=True)
-                page = context.new_page()
-            else:
-                context = browser.contexts[0]
-                if pageMethod == 'new_page':
-                    page = context.new_page()
-                else:
-                    page = context.pages[0]
         page.goto(url)
         if is_zsxz == '是':
             for i in range(15):
@@ -57,7 +42,109 @@ def run(playwright, browserMethod, contextMethod, pageMethod):
         else:
             page.wait_for_selector('#toolbar_header_function', timeout=600000)
 
-        return [browser, context, page]
+def stateSalt(state_folder):
+    """读取缓存目录中的随机盐，不存在时生成
+
+    盐文件只允许当前用户读写。多个线程或进程同时生成时，先写入临时文件再以硬链接创建盐文件，
+    只有一个能成功，其余读取已生成的盐。
+    """
+    salt_path = os.path.join(state_folder, 'state.salt')
+    if not os.path.exists(salt_path):
+        # mkstemp 创建的文件权限为 0600
+        fd, tmp_path = tempfile.mkstemp(dir=state_folder, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(os.urandom(16))
+            os.link(tmp_path, salt_path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+    with open(salt_path, 'rb') as f:
+        return f.read()
+
+def stateCipher():
+    """登录状态缓存的加密器，按登录方式和账号生成缓存文件和密钥
+
+    密钥由账号密码和缓存目录中的随机盐派生，不落盘；密码修改或删除盐文件后旧缓存自动失效。
+    """
+    login_way, username, password = ini_op.getinivalue('basic_config', 'login_way', 'gscloud_username', 'gscloud_password')
+    BASE_DIR = os.path.dirname(os.path.realpath(sys.argv[0]))
+    state_folder = os.path.join(BASE_DIR, 'Login State')
+    os.makedirs(state_folder, exist_ok=True)
+    name = hashlib.sha256((login_way+'|'+username).encode('utf-8')).hexdigest()[:16]
+    key = hashlib.pbkdf2_hmac('sha256', (login_way+'|'+username+'|'+password).encode('utf-8'), stateSalt(state_folder), 200000)
+    return os.path.join(state_folder, name+'.bin'), Fernet(base64.urlsafe_b64encode(key))
+
+def saveState(context, home_url):
+    """登录成功后加密保存浏览器的 storage_state"""
+    if Fernet is None:
+        return
+    state_path, cipher = stateCipher()
+    data = json.dumps({'url': home_url, 'storage_state': context.storage_state()}).encode('utf-8')
+    # 多个浏览器线程可能同时保存，各自写入独立的临时文件后再原子替换
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(state_path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(cipher.encrypt(data))
+        os.replace(tmp_path, state_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def loadState():
+    """读取登录状态缓存，不存在或无法解密时返回 None"""
+    if Fernet is None:
+        print('未安装 cryptography，不使用登录状态缓存')
+        return None
+    state_path, cipher = stateCipher()
+    try:
+        with open(state_path, 'rb') as f:
+            return json.loads(cipher.decrypt(f.read()))
+    except (OSError, InvalidToken, ValueError):
+        return None
 
+def probe(page, home_url):
+    """打开首页检查工具栏是否出现，判断登录是否仍然有效"""
+    probe_timeout = ini_op.getinivalue('basic_config', 'login_probe_timeout')[0]
+    try:
+        page.goto(home_url)
+        page.wait_for_selector('#toolbar_header_function', timeout=float(probe_timeout) * 1000)
+        return True
+    except Exception:
+        return False
 
+def restoreOrLogin(browser):
+    """优先恢复缓存的登录状态，探测失效时才完整登录，返回 context, page, 是否恢复成功"""
+    cached = loadState()
+    if cached:
+        context = newContext(browser, cached['storage_state'])
+        page = context.new_page()
+        if probe(page, cached['url']):
+            return context, page, True
+        context.close()
+    context = newContext(browser)
+    page = context.new_page()
+    login(page)
+    saveState(context, page.url)
+    return context, page, False
 
+def run(playwright, browserMethod, contextMethod, pageMethod):
+    chrome_port = ini_op.getinivalue('basic_config', 'chrome_port')[0]
+    if browserMethod == 'new_browser':
+        browser = launchBrowser(playwright)
+        context, page, restored = restoreOrLogin(browser)
+        return [browser, context, page]
+    else:
+        browser = playwright.chromium.connect_over_cdp('http://localhost:'+chrome_port)
+        if contextMethod == 'new_context':
+            context = browser.new_context(ignore_https_errors=True, accept_downloads=True, no_viewport=True)
+            page = context.new_page()
+        else:
+            context = browser.contexts[0]
+            if pageMethod == 'new_page':
+                page = context.new_page()
+            else:
+                page = context.pages[0]
+    login(page)
+    return [browser, context, page]
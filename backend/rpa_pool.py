@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+import rpa_login, ini_op, threading, queue, time
+from concurrent.futures import Future
+from playwright.sync_api import sync_playwright
+
+class BrowserSlot(threading.Thread):
+    """持有一个已登录浏览器的常驻线程
+
+    Playwright 同步接口只能在创建它的线程中使用，所以每个浏览器由固定线程持有，
+    任务提交到该线程执行。登录后的上下文一直保留，任务开始前探测登录状态，
+    会话失效时才重新登录，浏览器崩溃时重新启动。
+    """
+
+    def __init__(self, pool, index):
+        super().__init__(name=f'rpa-browser-{index}', daemon=True)
+        self.pool = pool
+        self.browser = None
+        self.context = None
+        self.home_url = None
+
+    def run(self):
+        try:
+            with sync_playwright() as playwright:
+                while True:
+                    job, future = self.pool.jobs.get()
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        future.set_result(self.execute(playwright, job))
+                    except BaseException as e:
+                        future.set_exception(e)
+        except BaseException as e:
+            # Playwright 启动失败时本线程无法执行任务，交给浏览器池处理排队中的任务
+            print(f"浏览器线程 {self.name} 启动失败: {e!r}")
+            self.pool.slotFailed(self, e)
+
+    def lease(self, playwright):
+        """准备一个已登录的页面，返回页面和启动方式
+
+        登录失败时关闭新启动的浏览器，下次任务重新启动，不保留未登录的浏览器。
+        """
+        if self.browser is None or not self.browser.is_connected():
+            browser = rpa_login.launchBrowser(playwright)
+            try:
+                context, page, restored = rpa_login.restoreOrLogin(browser)
+            except BaseException:
+                browser.close()
+                raise
+            self.browser, self.context, self.home_url = browser, context, page.url
+            return page, 'restored' if restored else 'cold'
+        page = self.context.new_page()
+        try:
+            if rpa_login.probe(page, self.home_url):
+                return page, 'warm'
+            rpa_login.login(page)
+            rpa_login.saveState(self.context, page.url)
+        except BaseException:
+            page.close()
+            raise
+        self.home_url = page.url
+        return page, 'relogin'
+
+    def execute(self, playwright, job):
+        start = time.perf_counter()
+        page, kind = self.lease(playwright)
+        self.pool.record(kind, time.perf_counter() - start)
+        try:
+            return job([self.browser, self.context, page])
+        finally:
+            page.close()
+
+class BrowserPool:
+    """常驻浏览器池，向任务出借已登录的页面"""
+
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.slots = []
+        self.lock = threading.Lock()
+        self.timings = {'cold': [], 'restored': [], 'warm': [], 'relogin': []}
+
+    def start(self):
+        with self.lock:
+            if self.slots:
+                return
+            pool_size = ini_op.getinivalue('basic_config', 'browser_pool_size')[0]
+            for i in range(max(int(pool_size), 1)):
+                slot = BrowserSlot(self, i)
+                slot.start()
+                self.slots.append(slot)
+
+    def submit(self, job):
+        """提交任务，job 接收 [browser, context, page]，返回 Future"""
+        future = Future()
+        # 先入队再启动，浏览器线程全部退出后提交的任务也会被重新启动的线程执行或标记失败
+        self.jobs.put((job, future))
+        self.start()
+        return future
+
+    def run(self, job):
+        return self.submit(job).result()
+
+    def slotFailed(self, slot, error):
+        """浏览器线程退出时移出浏览器池，全部退出后让排队中的任务失败，下次提交任务时重新启动"""
+        with self.lock:
+            if slot in self.slots:
+                self.slots.remove(slot)
+            if self.slots:
+                return
+            while True:
+                try:
+                    job, future = self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(error)
+
+    def record(self, kind, seconds):
+        with self.lock:
+            self.timings[kind].append(seconds)
+        name = {'cold': '冷启动', 'restored': '冷启动(恢复登录状态)', 'warm': '热启动', 'relogin': '重新登录'}[kind]
+        print(f"浏览器{name}，准备耗时 {seconds:.2f}s")
+
+    def stats(self):
+        with self.lock:
+            return {kind: {'count': len(values), 'avg_seconds': round(sum(values) / len(values), 3) if values else 0}
+                    for kind, values in self.timings.items()}
+
+pool = BrowserPool()
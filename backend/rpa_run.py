@@ -1,18 +1,76 @@
-import rpa_login, pdf_download, ini_op
-from playwright.sync_api import sync_playwright
-from playwright._impl._errors import Error
+import pdf_download, ini_op, rpa_pool, pandas, os, sys, time
+from time import strftime
 
 
-def run():
+def run(progress=None):
     dwbh = ini_op.getinivalue('basic_config', 'dwbh')[0]
-    with sync_playwright() as playwright:
-        llq = rpa_login.run(playwright, 'new_browser', 'now_context', 'now_page')
-        timenow = pdf_download.run(llq, dwbh)
+    # 从常驻浏览器池借用已登录的页面执行下载，避免每次启动浏览器并重新登录
+    return rpa_pool.pool.run(lambda llq: pdf_download.run(llq, dwbh, progress))
 
+def batchUnits():
+    """读取批量归档的单位编号：优先读取单位列表文件，其次是 dwbh_list，都为空时只处理 dwbh"""
+    dwbh, dwbh_list, dwbh_list_file, dwbh_head = ini_op.getinivalue('basic_config', 'dwbh', 'dwbh_list', 'dwbh_list_file', 'dwbh_head')
+    if dwbh_list_file.strip():
+        BASE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(sys.argv[0])))
+        if not os.path.isabs(dwbh_list_file):
+            dwbh_list_file = os.path.join(BASE_DIR, dwbh_list_file)
+        units = pandas.read_excel(dwbh_list_file, dtype={dwbh_head: str})[dwbh_head].dropna().astype(str).str.strip().tolist()
+    else:
+        units = [unit.strip() for unit in dwbh_list.split(',')]
+    # 去除空值和重复单位，保持原有顺序
+    return list(dict.fromkeys(unit for unit in units if unit)) or [dwbh]
 
-        return timenow
+def runUnit(llq, dwbh, timenow, progress, sort_workers):
+    start = time.perf_counter()
+    pdf_download.run(llq, dwbh, progress, os.path.join(timenow, dwbh), sort_workers)
+    return time.perf_counter() - start
 
+def unitSortWorkers(units):
+    """同时处理的各单位平分整理进程，避免每个单位都按全部CPU核心启动进程池"""
+    pool_size, = ini_op.getinivalue('basic_config', 'browser_pool_size')
+    sort_workers, = ini_op.getinivalue('pdf_config', 'sort_workers')
+    configured = int(sort_workers) or os.cpu_count() or 1
+    return max(1, configured // max(1, min(int(pool_size), len(units))))
 
+def runBatch(units=None, progress=None):
+    """批量归档多个单位
 
-
-        
\ No newline at end of file
+    每个单位作为一个任务提交到常驻浏览器池，由 browser_pool_size 个浏览器并行处理；
+    各单位的下载和整理结果分别保存在 时间/单位编号 子文件夹中，
+    全部完成后在输出文件夹生成汇总报告（各单位应下载和已下载的凭证数，以及凭证列表中的无效行），返回批次时间。
+    """
+    units = units or batchUnits()
+    pdf_folder, output_folder = ini_op.getinivalue('pdf_config', 'pdf_folder', 'output_folder')
+    BASE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(sys.argv[0])))
+    timenow = str(strftime("%Y%m%d%H%M%S"))
+    try:
+        vouchers, rejected = pdf_download.readVoucherList()
+    except Exception as e:
+        # 凭证列表无法读取时各单位任务会报告具体错误，这里只是报告中缺少应下载数量
+        print(f"读取凭证列表失败: {e}")
+        vouchers, rejected = None, None
+    sort_workers = unitSortWorkers(units)
+    start = time.perf_counter()
+    futures = [(dwbh, rpa_pool.pool.submit(lambda llq, dwbh=dwbh: runUnit(llq, dwbh, timenow, progress, sort_workers))) for dwbh in units]
+    report = []
+    for dwbh, future in futures:
+        unit_pdf_folder = os.path.join(BASE_DIR, pdf_folder, timenow, dwbh)
+        unit_output_folder = os.path.join(BASE_DIR, output_folder, timenow, dwbh)
+        try:
+            seconds, status, error = future.result(), '成功', ''
+        except Exception as e:
+            seconds, status, error = None, '失败', str(e)
+        downloaded = len([file for file in os.listdir(unit_pdf_folder) if file.endswith('.pdf')]) if os.path.isdir(unit_pdf_folder) else 0
+        expected = len(pdf_download.unitVouchers(vouchers, dwbh)) if vouchers is not None else None
+        report.append({'单位编号': dwbh, '状态': status, '应下载凭证数': expected, '下载凭证数': downloaded,
+                       '用时(秒)': round(seconds, 1) if seconds is not None else None, '输出文件夹': unit_output_folder, '错误信息': error})
+    elapsed = time.perf_counter() - start
+    report_path = os.path.join(BASE_DIR, output_folder, timenow, '批量归档报告.xlsx')
+    os.makedirs(os.path.dirname(report_path), exist_ok=True)
+    with pandas.ExcelWriter(report_path) as writer:
+        pandas.DataFrame(report).to_excel(writer, sheet_name='批量归档', index=False)
+        if rejected is not None:
+            rejected.to_excel(writer, sheet_name='无效凭证', index=False)
+    success = sum(1 for row in report if row['状态'] == '成功')
+    print(f"批量归档完成：{len(units)} 个单位，成功 {success} 个，无效凭证 {len(rejected) if rejected is not None else 0} 行，总用时 {elapsed:.1f} 秒，报告 {report_path}")
+    return timenow
@@ -0,0 +1,43 @@
+"""每个请求创建智能体的耗时: 旧做法(每次构建工具、LLM和智能体) 与 AgentFactory.get_agent 对比
+
+运行: python bench/bench_agent_setup.py [请求次数]
+"""
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "AI", "function_call_api"))
+os.chdir(tempfile.mkdtemp(prefix="bench_agent_setup_"))
+warnings.filterwarnings("ignore")
+
+from langchain.memory import ConversationBufferMemory
+from services.agent_service import agent_factory, create_agent, create_llm, create_tools
+
+# langchain 导入时会重新设置警告过滤
+warnings.filterwarnings("ignore")
+
+def per_request_build():
+    return create_agent(create_tools(), create_llm(), ConversationBufferMemory())
+
+def factory_get_agent():
+    return agent_factory.get_agent(ConversationBufferMemory())
+
+def measure(func, count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.99) - 1], sum(samples)
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    start = time.perf_counter()
+    agent_factory.get_agent()
+    print(f"AgentFactory 预热: {(time.perf_counter() - start) * 1000:.2f} ms")
+    for name, func in (("每次构建", per_request_build), ("AgentFactory.get_agent", factory_get_agent)):
+        p50, p99, total = measure(func, count)
+        print(f"{name:<24} p50 {p50 * 1000:8.3f} ms  p99 {p99 * 1000:8.3f} ms  合计 {total:.3f} s ({count} 次)")
@@ -0,0 +1,38 @@
+"""PageClassifier 的分类速度: 提取整页文字(probe_ratio=0) 与只提取页眉区域对比
+
+运行: python bench/bench_classifier.py [凭证数量] [probe_ratio...]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from voucher_corpus import makeCorpus, setup
+
+import fitz
+import ini_op
+from pdf_classifier import PageClassifier
+
+def measure(count, ratios):
+    base_dir = setup("bench_classifier_")
+    pdf_paths = makeCorpus(os.path.join(base_dir, "vouchers"), count)
+    ht_key, pz_key, pzrq_method, pzh_method = ini_op.getinivalue("pdf_config", "ht_key", "pz_key", "pzrq_method", "pzh_method")
+    docs = [fitz.open(pdf_path) for pdf_path in pdf_paths]
+    pages = sum(len(doc) for doc in docs)
+    print(f"凭证 {count} 个, 共 {pages} 页")
+    baseline = None
+    for ratio in ratios:
+        classifier = PageClassifier(ht_key, pz_key, pzrq_method, pzh_method, ratio)
+        start = time.perf_counter()
+        results = [classifier.classify(pdf_path, doc) for pdf_path, doc in zip(pdf_paths, docs)]
+        elapsed = time.perf_counter() - start
+        # 只提取页眉时分类结果应与整页提取一致
+        baseline = baseline or results
+        assert results == baseline
+        print(f"probe_ratio={ratio:<4}  {elapsed:7.3f} s  {pages / elapsed:9.1f} 页/秒")
+    for doc in docs:
+        doc.close()
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    measure(count, [float(arg) for arg in sys.argv[2:]] or [0, 0.3])
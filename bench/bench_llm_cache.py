@@ -0,0 +1,55 @@
+"""重复问题的响应耗时: 不使用缓存与使用 SQLiteLLMCache 的 p50/p99 对比
+
+LLM用固定延迟模拟模型生成时间, 每个问题先提问一次(写入缓存, 不计时), 再重复提问多次计时。
+运行: python bench/bench_llm_cache.py [问题数] [每个问题重复次数] [模拟生成耗时(秒)]
+"""
+import os
+import sys
+import tempfile
+import time
+import warnings
+from typing import Any, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "AI", "function_call_api"))
+os.chdir(tempfile.mkdtemp(prefix="bench_llm_cache_"))
+warnings.filterwarnings("ignore")
+
+from langchain_core.language_models.llms import LLM
+from services.cache_service import SQLiteLLMCache
+
+# langchain 导入时会重新设置警告过滤
+warnings.filterwarnings("ignore")
+
+class SlowLLM(LLM):
+    delay: float
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        time.sleep(self.delay)
+        return f"关于「{prompt}」的回答" * 20
+
+def measure(llm, questions, repeats):
+    for question in questions:
+        llm.invoke(question)
+    samples = []
+    for _ in range(repeats):
+        for question in questions:
+            start = time.perf_counter()
+            llm.invoke(question)
+            samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2], samples[max(int(len(samples) * 0.99) - 1, 0)]
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    delay = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
+    questions = [f"第{i}个城市的人口是多少" for i in range(count)]
+    cache = SQLiteLLMCache("llm_cache.db", 64 * 1024 * 1024)
+    for name, llm in (("无缓存", SlowLLM(delay=delay, cache=False)), ("SQLiteLLMCache", SlowLLM(delay=delay, cache=cache))):
+        p50, p99 = measure(llm, questions, repeats)
+        print(f"{name:<16} p50 {p50 * 1000:9.3f} ms  p99 {p99 * 1000:9.3f} ms  ({count} 个问题 x {repeats} 次)")
+    print(f"缓存统计: {cache.stats()}")
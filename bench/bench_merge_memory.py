@@ -0,0 +1,63 @@
+"""合并联合打印.pdf的峰值内存和耗时: 整体在内存中合并(merge_chunk_pages=0)与分块写入对比
+
+按多个总页数运行, 输出每种配置的峰值内存、每千页耗时, 以及峰值内存随页数增长的斜率(MB/千页)。
+分块写入时斜率应接近 0, 每千页耗时基本不随总页数增长。
+每种配置在独立子进程中运行, 峰值内存取子进程的 ru_maxrss。
+运行: python bench/bench_merge_memory.py [总页数,总页数...] [分块页数...]
+"""
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from voucher_corpus import makeCorpus, setup
+
+import pdf_sortAndRename
+
+PAGES_PER_VOUCHER = 10
+
+def child(pdf_folder, total_pages, chunk_pages):
+    """子进程: 合并 pdf_folder 中前 total_pages 页的凭证, 输出页数、用时和峰值内存"""
+    pdf_paths = [os.path.join(pdf_folder, file) for file in sorted(os.listdir(pdf_folder))][:total_pages // PAGES_PER_VOUCHER]
+    merge_path = os.path.join(pdf_folder, "..", f"联合打印_{total_pages}_{chunk_pages}.pdf")
+    start = time.perf_counter()
+    pdf_sortAndRename.mergePdf(merge_path, [(pdf_path, list(range(PAGES_PER_VOUCHER))) for pdf_path in pdf_paths], chunk_pages)
+    elapsed = time.perf_counter() - start
+    # Linux 下 ru_maxrss 的单位为 KB, 在打开合并结果校验之前取值
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    with pdf_sortAndRename.fitz.open(merge_path) as doc:
+        pages = len(doc)
+    os.remove(merge_path)
+    print(pages, elapsed, peak)
+
+def slope(points):
+    """最小二乘拟合 (页数, 值) 的斜率, 单位为每千页"""
+    mean_x = sum(x for x, y in points) / len(points)
+    mean_y = sum(y for x, y in points) / len(points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / sum((x - mean_x) ** 2 for x, y in points) * 1000
+
+def measure(sizes, chunk_list):
+    base_dir = setup("bench_merge_memory_")
+    pdf_folder = os.path.join(base_dir, "vouchers")
+    makeCorpus(pdf_folder, max(sizes) // PAGES_PER_VOUCHER, contract_pages=PAGES_PER_VOUCHER - 2, attachment_pages=1)
+    for chunk_pages in chunk_list:
+        print(f"merge_chunk_pages={chunk_pages}")
+        points = []
+        for total_pages in sizes:
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", pdf_folder, str(total_pages), str(chunk_pages)],
+                capture_output=True, text=True, check=True).stdout.split()
+            pages, elapsed, peak = int(output[-3]), float(output[-2]), float(output[-1])
+            assert pages == total_pages
+            points.append((total_pages, peak))
+            print(f"  {total_pages:6d} 页 {elapsed:7.2f} s  每千页 {elapsed / total_pages * 1000:5.2f} s  峰值内存 {peak:8.1f} MB")
+        if len(points) > 1:
+            print(f"  峰值内存斜率 {slope(points):.2f} MB/千页")
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+    else:
+        sizes = [int(size) for size in sys.argv[1].split(",")] if len(sys.argv) > 1 else [2000, 5000, 10000]
+        measure(sizes, [int(arg) for arg in sys.argv[2:]] or [0, 500])
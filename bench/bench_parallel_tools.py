@@ -0,0 +1,47 @@
+"""并行工具调用节省的时间: 脚本化LLM依次调用 N 个工具与一次给出 N 个工具调用的对比
+
+运行: python bench/bench_parallel_tools.py [工具调用数] [每个工具耗时(秒)]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "AI", "function_call_api"))
+sys.path.insert(0, os.path.join(ROOT, "tests", "function_call_api"))
+os.chdir(tempfile.mkdtemp(prefix="bench_parallel_tools_"))
+
+from langchain.tools import StructuredTool
+from services.agent_service import create_agent, create_parallel_agent
+from fake_llm import ScriptedLLM, final_answer, tool_call
+
+# langchain 导入时会重新设置警告过滤
+warnings.filterwarnings("ignore")
+
+def slow_tools(delay):
+    def get_weather(location: str) -> str:
+        time.sleep(delay)
+        return f"{location} 晴"
+
+    return [StructuredTool.from_function(get_weather, name="GetWeather", description="查询天气")]
+
+def run(agent):
+    start = time.perf_counter()
+    asyncio.run(agent.ainvoke({"input": "查询天气"}))
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    calls = [("GetWeather", {"location": f"城市{i}"}) for i in range(count)]
+    sequential = create_agent(slow_tools(delay), ScriptedLLM(responses=[tool_call(call) for call in calls] + [final_answer("完成")]))
+    parallel = create_parallel_agent(slow_tools(delay), ScriptedLLM(responses=[tool_call(*calls), final_answer("完成")]))
+    sequential.verbose = parallel.verbose = False
+    sequential_time, parallel_time = run(sequential), run(parallel)
+    print(f"{count} 个工具调用, 每个 {delay}s")
+    print(f"顺序调用: {sequential_time:.2f}s ({count + 1} 次LLM调用)")
+    print(f"并行调用: {parallel_time:.2f}s (2 次LLM调用)")
+    print(f"节省: {sequential_time - parallel_time:.2f}s ({(1 - parallel_time / sequential_time) * 100:.0f}%)")
@@ -0,0 +1,37 @@
+"""sortFiles 在合成凭证语料上的吞吐: 逐个整理与多进程整理对比
+
+运行: python bench/bench_sort_files.py [凭证数量] [进程数...]
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from voucher_corpus import makeCorpus, setup
+
+import pdf_sortAndRename
+
+def measure(count, workers_list):
+    setup("bench_sort_files_")
+    timenow = "bench"
+    pdf_folder, output_folder, sort_pdf, settings, sort_workers, merge_chunk_pages = pdf_sortAndRename.loadConfig(timenow)
+    pdf_paths = makeCorpus(pdf_folder, count)
+    pages = 0
+    for pdf_path in pdf_paths:
+        with pdf_sortAndRename.fitz.open(pdf_path) as doc:
+            pages += len(doc)
+    print(f"凭证 {count} 个, 共 {pages} 页, CPU {os.cpu_count()} 核")
+    for workers in workers_list:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = list(pdf_sortAndRename.sortFiles(sort_pdf, pdf_paths, workers))
+        elapsed = time.perf_counter() - start
+        assert len(results) == count and results[0][2:] == ("20240105", "记-0000")
+        print(f"sort_workers={workers:<3d} {elapsed:7.2f} s  {pages / elapsed:8.1f} 页/秒")
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    workers_list = [int(arg) for arg in sys.argv[2:]] or sorted({1, 2, 4, os.cpu_count() or 1})
+    measure(count, workers_list)
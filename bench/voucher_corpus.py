@@ -0,0 +1,65 @@
+"""backend 基准测试共用: 在临时目录中准备 config.ini 并生成合成的凭证PDF
+
+每个凭证PDF包含一页记账凭证、若干页合同和附件, 文字与真实凭证的关键字和正则匹配。
+"""
+import configparser
+import os
+import shutil
+import sys
+import tempfile
+import warnings
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND_DIR)
+warnings.filterwarnings("ignore")
+
+import fitz
+
+def setup(prefix, **pdf_config):
+    """创建临时工作目录并切换过去, pdf_config 覆盖 config.ini 中 [pdf_config] 的配置
+
+    backend 按 sys.argv[0] 的上两级目录定位下载和输出文件夹, 这里指向临时目录。
+    """
+    base_dir = tempfile.mkdtemp(prefix=prefix)
+    os.makedirs(os.path.join(base_dir, "backend"))
+    config = configparser.ConfigParser(interpolation=None)
+    config.read(os.path.join(BACKEND_DIR, "config.ini"), encoding="utf-8")
+    for key, value in pdf_config.items():
+        config.set("pdf_config", key, str(value))
+    with open(os.path.join(base_dir, "config.ini"), "w", encoding="utf-8") as f:
+        config.write(f)
+    os.chdir(base_dir)
+    sys.argv[0] = os.path.join(base_dir, "backend", "bench.py")
+    return base_dir
+
+def writeVoucher(pdf_path, index, contract_pages=2, attachment_pages=1):
+    """生成一个凭证PDF: 附件页在前, 然后是合同页和凭证页, 整理后凭证页应排到最前"""
+    doc = fitz.open()
+    for i in range(attachment_pages):
+        page = doc.new_page()
+        page.insert_text((50, 60), f"发票附件 {index}-{i}", fontname="china-s", fontsize=12)
+        page.insert_text((50, 400), "附件正文 " * 20, fontname="china-s", fontsize=10)
+    for i in range(contract_pages):
+        page = doc.new_page()
+        page.insert_text((50, 60), "技术开发合同" if i == 0 else f"合同续页 {i}", fontname="china-s", fontsize=12)
+        page.insert_text((50, 400), "合同条款 " * 20, fontname="china-s", fontsize=10)
+    page = doc.new_page()
+    page.insert_text((250, 40), "记账凭证", fontname="china-s", fontsize=14)
+    page.insert_text((50, 70), f"日期：2024{index % 12 + 1:02d}05", fontname="china-s", fontsize=10)
+    page.insert_text((400, 70), f"记-{index:04d}号", fontname="china-s", fontsize=10)
+    for line in range(20):
+        page.insert_text((50, 120 + line * 30), f"摘要 科目 借方 贷方 {line}", fontname="china-s", fontsize=10)
+    doc.save(pdf_path)
+    doc.close()
+
+def makeCorpus(pdf_folder, count, **kwargs):
+    """在 pdf_folder 中生成 count 个凭证PDF, 返回文件路径列表"""
+    if os.path.exists(pdf_folder):
+        shutil.rmtree(pdf_folder)
+    os.makedirs(pdf_folder)
+    paths = []
+    for index in range(count):
+        pdf_path = os.path.join(pdf_folder, f"{index:05d}.pdf")
+        writeVoucher(pdf_path, index, **kwargs)
+        paths.append(pdf_path)
+    return paths
@@ -0,0 +1,35 @@
+import os
+import shutil
+import sys
+import types
+
+import pytest
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..", "..")
+BACKEND_DIR = os.path.join(ROOT_DIR, "backend")
+
+# backend 的模块以 backend 为工作目录运行, 彼此直接按文件名导入
+sys.path.insert(0, BACKEND_DIR)
+# 合成凭证PDF与基准测试共用 bench/voucher_corpus.py
+sys.path.insert(0, os.path.join(ROOT_DIR, "bench"))
+
+# pyautogui 导入时需要图形界面, 测试中不会真正调用它
+try:
+    import pyautogui
+except Exception:
+    sys.modules["pyautogui"] = types.ModuleType("pyautogui")
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """复制 config.ini 到临时目录并切换过去
+
+    backend 按 sys.argv[0] 的上两级目录定位下载和输出文件夹, 这里指向临时目录。
+    默认逐个整理, 避免测试启动进程池。
+    """
+    shutil.copy(os.path.join(BACKEND_DIR, "config.ini"), tmp_path / "config.ini")
+    (tmp_path / "backend").mkdir()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", [str(tmp_path / "backend" / "app.py")])
+    import ini_op
+    ini_op.opinivalue("pdf_config", sort_workers="1")
+    return tmp_path
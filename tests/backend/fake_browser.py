@@ -0,0 +1,189 @@
+"""模拟 playwright 的页面、frame 和浏览器, 用于不启动浏览器测试凭证下载流程
+
+FakeFrame 记录每次点击和填写; rows 为当前筛选结果中显示的凭证号, 按日期查询时显示
+visible 中该日期的凭证, 按凭证号查询时只显示该凭证。fail_on 中的凭证号在点击打印时抛出异常,
+drop_searches 为之后多少次点击筛选不返回列表数据。FakePage.expect_response 在响应不满足
+predicate 或请求被丢弃时抛出 TimeoutError。
+"""
+import contextlib
+import types
+
+from playwright._impl._errors import TimeoutError
+
+
+class FakeLocator:
+    def __init__(self, frame, selector):
+        self.frame = frame
+        self.selector = selector
+
+    @property
+    def first(self):
+        return self
+
+    @property
+    def last(self):
+        return self
+
+    def locator(self, selector):
+        return FakeLocator(self.frame, self.selector + " >> " + selector)
+
+    def click(self):
+        self.frame.click(self.selector)
+
+    def press(self, key):
+        pass
+
+    def count(self):
+        return self.frame.count(self.selector)
+
+
+class FakeFrame:
+    def __init__(self, visible=None, fail_on=(), drop_searches=0):
+        self.visible = visible or {}
+        self.fail_on = set(fail_on)
+        self.drop_searches = drop_searches
+        self.dropped = False
+        self.fields = {}
+        self.rows = []
+        self.actions = []
+        self.date = None
+        self.searches = 0
+
+    def locator(self, selector):
+        return FakeLocator(self, selector)
+
+    def fill(self, selector, value):
+        self.fields[selector] = value
+
+    def click(self, selector):
+        self.actions.append(selector)
+        if selector.startswith("td[lay-ymd="):
+            year, month, day = selector.split('"')[1].split("-")
+            self.date = f"{year}-{int(month):02d}-{int(day):02d}"
+        elif 'button:text-matches("筛选")' in selector:
+            if self.drop_searches:
+                self.drop_searches -= 1
+                self.dropped = True
+            else:
+                self.filter()
+        elif selector.startswith('td[id$=FSBZDJ_PZH] a[title="'):
+            pzh = selector.split('"')[1]
+            if pzh in self.fail_on:
+                raise RuntimeError(f"打印凭证 {pzh} 失败")
+
+    def filter(self):
+        """按当前日期和凭证号条件刷新列表"""
+        self.searches += 1
+        pzh = self.fields.get("#FSBZDJ_PZH")
+        rows = self.visible.get(self.date, [])
+        self.rows = [pzh] if pzh else list(rows)
+
+    def count(self, selector):
+        if selector.startswith('td[id$=FSBZDJ_PZH] a[title="'):
+            return int(selector.split('"')[1] in self.rows)
+        return 1
+
+    def wait_for_selector(self, selector, timeout=None):
+        if "请选中一条单据" in selector:
+            raise TimeoutError("未出现提示")
+        if selector.startswith('td[id$=FSBZDJ_PZH] a[title="') and not self.count(selector):
+            raise TimeoutError(f"等待 {selector} 超时")
+
+
+class FakePage:
+    url = "http://cpfms.test/index"
+
+    def __init__(self, frame=None):
+        self.frame = frame or FakeFrame()
+        self.actions = []
+
+    def evaluate(self, expression):
+        return "FakeBrowser"
+
+    def goto(self, url):
+        pass
+
+    def close(self):
+        pass
+
+    def wait_for_selector(self, selector, timeout=None):
+        pass
+
+    def click(self, selector):
+        self.actions.append(selector)
+
+    @contextlib.contextmanager
+    def expect_response(self, predicate, timeout=None):
+        response = types.SimpleNamespace(url="http://cpfms.casccloud.cn/api/BP/EIS/v1.0/imagedownload/print?id=1",
+            request=types.SimpleNamespace(resource_type="xhr"), frame=self.frame, status=200)
+        yield types.SimpleNamespace(value=response)
+        if self.frame.dropped or not predicate(response):
+            self.frame.dropped = False
+            raise TimeoutError("等待响应超时")
+
+
+class FakeContext:
+    def __init__(self, frame_factory):
+        self.frame_factory = frame_factory
+        self.pages = []
+
+    def new_page(self):
+        self.pages.append(FakePage(self.frame_factory()))
+        return self.pages[-1]
+
+    def cookies(self):
+        return []
+
+    def storage_state(self):
+        return {"cookies": [], "origins": []}
+
+
+class FakeBrowser:
+    def __init__(self, frame_factory):
+        self.frame_factory = frame_factory
+        self.closed = False
+        self.contexts = []
+
+    def new_context(self, **kwargs):
+        self.contexts.append(FakeContext(self.frame_factory))
+        return self.contexts[-1]
+
+    def is_connected(self):
+        return not self.closed
+
+    def close(self):
+        self.closed = True
+
+
+@contextlib.contextmanager
+def fake_sync_playwright():
+    yield types.SimpleNamespace()
+
+
+class FakeProgress:
+    """记录下载进度回调"""
+
+    def __init__(self):
+        self.done = []
+        self.failed = []
+        self.started = []
+        self.total = 0
+        self.events = []
+
+    def voucherStart(self, pzrq, pzh):
+        self.started.append((pzrq, pzh))
+
+    def voucherDone(self, pzrq, pzh):
+        self.done.append((pzrq, pzh))
+
+    def voucherFailed(self, pzrq, pzh, error):
+        self.failed.append((pzrq, pzh))
+
+    def addTotal(self, count):
+        self.total += count
+
+    def emit(self, event, **data):
+        self.events.append((event, data))
+
+    def fileSorted(self, pdf_path, result):
+        pass
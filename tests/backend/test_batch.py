@@ -0,0 +1,93 @@
+import os
+from concurrent.futures import Future
+
+import pandas
+import pytest
+
+import ini_op
+import pdf_download
+import rpa_pool
+import rpa_run
+
+VOUCHER_LIST = pandas.DataFrame({
+    "凭证日期": ["2024-01-05", "2024/1/6", "20240107", "2024-01-08", "无效日期", "2024-01-09", "2024-01-10"],
+    "凭证号": ["记-0001", "记-0002", "记-0003", None, "记-0005", "记-0006", " 记-0007 "],
+    "单位编号": ["03038", "3038", "05001", "03038", "05001", None, "  "],
+})
+
+def write_voucher_list(workdir, df):
+    with pandas.ExcelWriter(workdir / "联合打印.xlsx") as writer:
+        df.to_excel(writer, sheet_name="联合打印", index=False)
+
+def test_empty_unit_rows_are_rejected():
+    vouchers, rejected = pdf_download.parseVoucherList(VOUCHER_LIST, "凭证日期", "凭证号", "单位编号")
+    assert list(vouchers["pzh"]) == ["记-0001", "记-0002", "记-0003"]
+    assert list(vouchers["pzrq"]) == ["2024-01-05", "2024-01-06", "2024-01-07"]
+    assert rejected.to_dict("records") == [
+        {"行号": 5, "原因": "凭证号为空"},
+        {"行号": 6, "原因": "凭证日期无效"},
+        {"行号": 7, "原因": "单位编号为空"},
+        {"行号": 8, "原因": "单位编号为空"},
+    ]
+
+def test_without_unit_column_only_date_and_number_are_checked():
+    vouchers, rejected = pdf_download.parseVoucherList(VOUCHER_LIST.drop(columns="单位编号"), "凭证日期", "凭证号", "单位编号")
+    assert list(vouchers["pzh"]) == ["记-0001", "记-0002", "记-0003", "记-0006", "记-0007"]
+    assert list(rejected["原因"]) == ["凭证号为空", "凭证日期无效"]
+
+class ImmediatePool:
+    """在当前线程依次执行任务的浏览器池"""
+
+    def submit(self, job):
+        future = Future()
+        try:
+            future.set_result(job([None, None, None]))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+@pytest.fixture
+def batch(workdir, monkeypatch):
+    write_voucher_list(workdir, VOUCHER_LIST)
+    calls = []
+
+    def run(llq, dwbh, progress=None, timenow=None, sort_workers=None):
+        calls.append((dwbh, sort_workers))
+        if dwbh == "09999":
+            raise RuntimeError("单位不存在")
+        pdf_folder = workdir / ini_op.getinivalue("pdf_config", "pdf_folder")[0] / timenow
+        os.makedirs(pdf_folder, exist_ok=True)
+        vouchers = pdf_download.unitVouchers(pdf_download.readVoucherList()[0], dwbh)
+        for pzrq, pzh in zip(vouchers["pzrq"], vouchers["pzh"]):
+            (pdf_folder / f"{pzrq}{pzh}.pdf").write_bytes(b"%PDF-")
+        return timenow
+
+    monkeypatch.setattr(rpa_pool, "pool", ImmediatePool())
+    monkeypatch.setattr(pdf_download, "run", run)
+    return calls
+
+def read_report(workdir, timenow):
+    output_folder = ini_op.getinivalue("pdf_config", "output_folder")[0]
+    path = workdir / output_folder / timenow / "批量归档报告.xlsx"
+    return pandas.read_excel(path, sheet_name=None, dtype={"单位编号": str})
+
+def test_report_lists_expected_counts_and_rejected_rows(batch, workdir):
+    timenow = rpa_run.runBatch(["03038", "05001", "09999"])
+    report = read_report(workdir, timenow)
+    summary = report["批量归档"].set_index("单位编号")
+    assert summary.loc["03038", "应下载凭证数"] == 2 and summary.loc["03038", "下载凭证数"] == 2
+    assert summary.loc["05001", "应下载凭证数"] == 1 and summary.loc["05001", "下载凭证数"] == 1
+    assert summary.loc["09999", "状态"] == "失败" and summary.loc["09999", "应下载凭证数"] == 0
+    assert list(report["无效凭证"]["原因"]) == ["凭证号为空", "凭证日期无效", "单位编号为空", "单位编号为空"]
+
+@pytest.mark.parametrize("pool_size, sort_workers, units, expected", [
+    ("1", "8", ["03038", "05001"], 8),
+    ("2", "8", ["03038", "05001"], 4),
+    ("4", "8", ["03038", "05001"], 4),
+    ("3", "2", ["03038", "05001", "09999"], 1),
+])
+def test_sort_workers_are_split_between_units(batch, pool_size, sort_workers, units, expected):
+    ini_op.opinivalue("basic_config", browser_pool_size=pool_size)
+    ini_op.opinivalue("pdf_config", sort_workers=sort_workers)
+    rpa_run.runBatch(units)
+    assert batch == [(unit, expected) for unit in units]
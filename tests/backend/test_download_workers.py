@@ -0,0 +1,107 @@
+import itertools
+import os
+
+import pandas
+import pytest
+
+import ini_op
+import pdf_download
+import rpa_login
+from fake_browser import FakeBrowser, FakeContext, FakePage, FakeFrame, FakeProgress, fake_sync_playwright
+from voucher_corpus import writeVoucher
+
+TIMENOW = "20240101000000"
+
+VOUCHERS = [("2024-01-05", "记-0001"), ("2024-01-05", "记-0002"), ("2024-01-05", "记-0003"),
+    ("2024-02-05", "记-0004"), ("2024-02-05", "记-0005"), ("2024-02-05", "记-0006")]
+
+@pytest.fixture
+def downloads(workdir, monkeypatch):
+    """用模拟浏览器代替 playwright, 保存PDF时直接生成凭证文件"""
+    ini_op.opinivalue("pdf_config", download_workers="2", fetch_workers="0")
+    browsers = []
+    frames = {"fail_on": ()}
+    visible = {}
+    for pzrq, pzh in VOUCHERS:
+        visible.setdefault(pzrq, []).append(pzh)
+
+    def frame_factory():
+        return FakeFrame(visible, frames["fail_on"])
+
+    def launchBrowser(playwright, slow_mo=50):
+        browsers.append(FakeBrowser(frame_factory))
+        return browsers[-1]
+
+    index = itertools.count()
+
+    def savePdf(self, url, pdf_path):
+        writeVoucher(pdf_path, next(index))
+        self.on_saved(pdf_path)
+        self.count += 1
+
+    vouchers = pandas.DataFrame(VOUCHERS, columns=["pzrq", "pzh"])
+    monkeypatch.setattr(pdf_download, "sync_playwright", fake_sync_playwright)
+    monkeypatch.setattr(rpa_login, "launchBrowser", launchBrowser)
+    monkeypatch.setattr(pdf_download, "openPrintFrame", lambda page, dwbh: page.frame)
+    monkeypatch.setattr(pdf_download, "loadVoucherList", lambda *args: (vouchers, pandas.DataFrame({"行号": [], "原因": []})))
+    monkeypatch.setattr(pdf_download.VoucherDownloader, "savePdf", savePdf)
+    return frames, browsers
+
+def run(progress):
+    context = FakeContext(FakeFrame)
+    return pdf_download.run((None, context, FakePage()), "0001", progress, TIMENOW)
+
+def output_folder(workdir):
+    return os.path.join(workdir, "pdfFilesSort", TIMENOW)
+
+def test_workers_download_all_vouchers(downloads, workdir):
+    frames, browsers = downloads
+    progress = FakeProgress()
+    assert run(progress) == TIMENOW
+    assert sorted(progress.done) == VOUCHERS
+    assert progress.failed == []
+    assert len(browsers) == 2 and all(browser.closed for browser in browsers)
+    with open(os.path.join(output_folder(workdir), "manifest.jsonl"), encoding="utf-8") as f:
+        assert len(f.readlines()) == 6
+
+def test_failed_worker_marks_remaining_rows_and_raises(downloads, workdir):
+    frames, browsers = downloads
+    frames["fail_on"] = {"记-0005"}
+    progress = FakeProgress()
+    with pytest.raises(RuntimeError, match="下载线程"):
+        run(progress)
+    # 出错的凭证和同一线程中排在其后的凭证记为失败, 其他线程不受影响
+    assert progress.failed == [("2024-02-05", "记-0005"), ("2024-02-05", "记-0006")]
+    assert sorted(progress.done) == VOUCHERS[:4]
+    assert all(browser.closed for browser in browsers)
+    # 已下载的凭证照常整理并合并
+    with open(os.path.join(output_folder(workdir), "manifest.jsonl"), encoding="utf-8") as f:
+        assert len(f.readlines()) == 4
+    assert os.path.exists(os.path.join(output_folder(workdir), "联合打印.pdf"))
+
+def test_browser_start_failure_marks_whole_shard(downloads, monkeypatch):
+    def launchBrowser(playwright, slow_mo=50):
+        raise RuntimeError("浏览器启动失败")
+
+    monkeypatch.setattr(rpa_login, "launchBrowser", launchBrowser)
+    progress = FakeProgress()
+    with pytest.raises(RuntimeError, match="浏览器启动失败"):
+        run(progress)
+    assert sorted(progress.failed) == VOUCHERS
+    assert progress.done == []
+
+def test_fetcher_is_closed_when_download_fails(workdir, monkeypatch):
+    closed = []
+    close = pdf_download.PdfFetcher.close
+
+    def recording(self):
+        closed.append(self)
+        close(self)
+
+    monkeypatch.setattr(pdf_download.PdfFetcher, "close", recording)
+    frame = FakeFrame({"2024-01-05": ["记-0001"]}, fail_on={"记-0001"})
+    downloader = pdf_download.VoucherDownloader(FakeContext(FakeFrame), FakePage(frame), str(workdir), fetch_workers=1)
+    downloader.frame = frame
+    with pytest.raises(RuntimeError, match="打印凭证"):
+        downloader.run([("2024-01-05", "记-0001")])
+    assert closed == [downloader.fetcher]
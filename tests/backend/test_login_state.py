@@ -0,0 +1,54 @@
+import os
+import stat
+import sys
+import threading
+
+import pytest
+
+import rpa_login
+
+pytestmark = pytest.mark.skipif(rpa_login.Fernet is None, reason="未安装 cryptography")
+
+class StateContext:
+    def __init__(self, index):
+        self.index = index
+
+    def storage_state(self):
+        return {"cookies": [{"name": "token", "value": str(self.index) * 4096}], "origins": []}
+
+def test_concurrent_saves_leave_one_valid_state(workdir):
+    def save(index):
+        for _ in range(3):
+            rpa_login.saveState(StateContext(index), f"http://cpfms.test/{index}")
+
+    threads = [threading.Thread(target=save, args=(index,)) for index in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    state = rpa_login.loadState()
+    index = int(state["url"].rsplit("/", 1)[1])
+    # 最后一次写入完整保留, 不会与其他线程的内容交错
+    assert state["storage_state"]["cookies"][0]["value"] == str(index) * 4096
+    state_folder = os.path.join(workdir, "backend", "Login State")
+    assert [file for file in os.listdir(state_folder) if file.endswith(".tmp")] == []
+    assert sorted(os.listdir(state_folder)) == sorted([os.path.basename(rpa_login.stateCipher()[0]), "state.salt"])
+
+def test_state_survives_restart_with_persisted_salt(workdir):
+    rpa_login.saveState(StateContext(1), "http://cpfms.test/1")
+    state_folder = os.path.join(workdir, "backend", "Login State")
+    salt_path = os.path.join(state_folder, "state.salt")
+    with open(salt_path, "rb") as f:
+        salt = f.read()
+    assert len(salt) == 16
+    if sys.platform != "win32":
+        assert stat.S_IMODE(os.stat(salt_path).st_mode) == 0o600
+
+    # 重启后读取同一个盐, 缓存仍可解密
+    assert rpa_login.loadState()["url"] == "http://cpfms.test/1"
+    assert rpa_login.stateSalt(state_folder) == salt
+
+    # 盐文件丢失后生成新的盐, 旧缓存作废
+    os.remove(salt_path)
+    assert rpa_login.loadState() is None
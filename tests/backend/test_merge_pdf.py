@@ -0,0 +1,47 @@
+import os
+
+import fitz
+import pytest
+
+import pdf_sortAndRename
+from voucher_corpus import writeVoucher
+
+@pytest.fixture
+def sources(tmp_path):
+    """5 个凭证, 每个 4 页, 各取部分页面并打乱顺序"""
+    sources = []
+    for index in range(5):
+        pdf_path = str(tmp_path / f"{index:02d}.pdf")
+        writeVoucher(pdf_path, index, contract_pages=2, attachment_pages=1)
+        sources.append((pdf_path, [3, 0, 1] if index % 2 else [3, 2, 1, 0]))
+    return sources
+
+def page_texts(pdf_path, pages=None):
+    with fitz.open(pdf_path) as doc:
+        return [doc[page].get_text() for page in (range(len(doc)) if pages is None else pages)]
+
+@pytest.mark.parametrize("chunk_pages", [0, 3, 4, 100])
+def test_chunked_merge_keeps_page_order(sources, tmp_path, chunk_pages):
+    merge_path = pdf_sortAndRename.mergePdf(str(tmp_path / "联合打印.pdf"), sources, chunk_pages)
+    expected = [text for pdf_path, pages in sources for text in page_texts(pdf_path, pages)]
+    assert page_texts(merge_path) == expected
+
+def test_each_chunk_gets_its_own_page_tree_node(sources, tmp_path):
+    merge_path = pdf_sortAndRename.mergePdf(str(tmp_path / "联合打印.pdf"), sources, 4)
+    with fitz.open(merge_path) as doc:
+        root = int(doc.xref_get_key(doc.pdf_catalog(), "Pages")[1].split()[0])
+        groups = pdf_sortAndRename.pageRefs(doc, root)
+        # 共 18 页, 每 4 页一个中间节点, 最后一块 2 页
+        assert [int(doc.xref_get_key(group, "Count")[1]) for group in groups] == [4, 4, 4, 4, 2]
+        assert int(doc.xref_get_key(root, "Count")[1]) == len(doc) == 18
+        assert doc.page_xref(17) == pdf_sortAndRename.pageRefs(doc, groups[-1])[-1]
+
+def test_links_survive_chunked_merge(sources, tmp_path):
+    pdf_path = str(tmp_path / "link.pdf")
+    with fitz.open() as doc:
+        page = doc.new_page()
+        page.insert_link({"kind": fitz.LINK_URI, "from": fitz.Rect(50, 50, 150, 70), "uri": "https://cpfms.casccloud.cn/"})
+        doc.save(pdf_path)
+    merge_path = pdf_sortAndRename.mergePdf(str(tmp_path / "联合打印.pdf"), sources + [(pdf_path, [0])], 4)
+    with fitz.open(merge_path) as doc:
+        assert [link["uri"] for link in doc[-1].get_links()] == ["https://cpfms.casccloud.cn/"]
@@ -0,0 +1,32 @@
+import importlib
+import socket
+
+import httpx
+import pytest
+
+@pytest.fixture
+def ollama_transport(workdir):
+    # 模块导入时读取 config.ini
+    import ollama_transport
+    return importlib.reload(ollama_transport)
+
+def closed_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def test_clients_share_the_transport(ollama_transport):
+    assert ollama_transport.client_kwargs()["transport"] is ollama_transport.transport
+    assert ollama_transport.async_client_kwargs()["transport"] is ollama_transport.async_transport
+
+def test_connect_failures_open_the_breaker(ollama_transport):
+    breaker = ollama_transport.CircuitBreaker(2, 60)
+    transport = ollama_transport.ResilientTransport(breaker, max_retries=1, backoff=0)
+    url = f"http://127.0.0.1:{closed_port()}/api/tags"
+    with httpx.Client(transport=transport) as client:
+        for _ in range(2):
+            with pytest.raises(httpx.ConnectError):
+                client.get(url)
+        assert breaker.state == "open"
+        with pytest.raises(ollama_transport.CircuitOpenError):
+            client.get(url)
@@ -0,0 +1,175 @@
+import json
+import os
+import threading
+import time
+import types
+
+import pytest
+
+import ini_op
+import rpa_events
+import rpa_jobs
+import rpa_run
+
+def wait_for(get, job_id, timeout=5):
+    """轮询任务状态直到结束"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        data = get(job_id)
+        if data and data["status"] in ("finished", "failed"):
+            return data
+        time.sleep(0.02)
+    raise AssertionError(f"任务 {job_id} 未在 {timeout} 秒内结束")
+
+@pytest.fixture
+def manager(workdir, monkeypatch):
+    ini_op.opinivalue("basic_config", job_workers="1")
+    manager = rpa_jobs.JobManager(str(workdir / "rpadata.db"))
+    monkeypatch.setattr(rpa_jobs, "job_manager", manager)
+    yield manager
+    if manager.executor:
+        manager.executor.shutdown(wait=True)
+
+def fake_download(progress):
+    progress.addTotal(3)
+    progress.voucherDone("2024-01-05", "记-0001")
+    progress.voucherDone("2024-01-05", "记-0002")
+    progress.voucherFailed("2024-01-05", "记-0003", "超时")
+    return "20240101000000"
+
+def test_submit_reports_progress_and_result(manager):
+    job_id = manager.submit("pdfDownload", fake_download)
+    data = wait_for(manager.get, job_id)
+    assert data["status"] == "finished"
+    assert data["filePath"] == "20240101000000"
+    assert (data["total"], data["done"], data["failed"]) == (3, 2, 1)
+    assert data["started"] and data["finished"]
+    # 结束的任务不再保留在内存中, 从历史记录中读取
+    assert manager.jobs == {}
+    assert manager.get(job_id) == data
+
+def test_failed_job_records_error(manager):
+    def broken(progress):
+        raise RuntimeError("凭证列表不存在")
+
+    data = wait_for(manager.get, manager.submit("pdfDownload", broken))
+    assert data["status"] == "failed"
+    assert data["error"] == "凭证列表不存在"
+    assert data["filePath"] is None
+
+def test_jobs_run_in_submission_order(manager):
+    order = []
+    release = threading.Event()
+
+    def job(index):
+        def run(progress):
+            release.wait(5)
+            order.append(index)
+        return run
+
+    job_ids = [manager.submit("pdfDownload", job(index)) for index in range(3)]
+    # job_workers=1 时后提交的任务排队等待
+    assert [manager.get(job_id)["status"] for job_id in job_ids[1:]] == ["queued", "queued"]
+    release.set()
+    for job_id in job_ids:
+        wait_for(manager.get, job_id)
+    assert order == [0, 1, 2]
+
+def test_history_survives_restart(manager, workdir):
+    job_id = manager.submit("pdfDownload", fake_download)
+    wait_for(manager.get, job_id)
+
+    restarted = rpa_jobs.JobManager(str(workdir / "rpadata.db"))
+    data = restarted.get(job_id)
+    assert data["status"] == "finished"
+    assert data["filePath"] == "20240101000000"
+    assert (data["total"], data["done"], data["failed"]) == (3, 2, 1)
+    assert [row["id"] for row in restarted.history()] == [job_id]
+    assert restarted.get("不存在") is None
+
+def test_unfinished_jobs_are_interrupted_on_restart(manager, workdir):
+    running = rpa_jobs.Job("running-job", "pdfDownload")
+    running.status = "running"
+    queued = rpa_jobs.Job("queued-job", "pdfDownload")
+    manager.save(running)
+    manager.save(queued)
+
+    restarted = rpa_jobs.JobManager(str(workdir / "rpadata.db"))
+    restarted.start()
+    try:
+        assert restarted.get("running-job")["status"] == "interrupted"
+        assert restarted.get("queued-job")["status"] == "interrupted"
+    finally:
+        restarted.executor.shutdown(wait=True)
+
+@pytest.fixture
+def client(manager):
+    import app
+    return app.app.test_client()
+
+def test_flask_submit_and_poll(client, monkeypatch):
+    monkeypatch.setattr(rpa_run, "run", fake_download)
+    response = client.get("/rpa/pdfDownload/run")
+    assert response.status_code == 200
+    job_id = response.json["jobId"]
+
+    data = wait_for(lambda job_id: client.get(f"/rpa/jobs/{job_id}").json["data"], job_id)
+    assert data["status"] == "finished"
+    output_folder = ini_op.getinivalue("pdf_config", "output_folder")[0]
+    assert data["filePath"].endswith(os.path.join(output_folder, "20240101000000"))
+    assert [row["id"] for row in client.get("/rpa/jobs").json["data"]] == [job_id]
+
+def test_flask_failed_job_and_unknown_job(client, monkeypatch):
+    def broken(progress):
+        raise RuntimeError("浏览器启动失败")
+
+    monkeypatch.setattr(rpa_run, "run", broken)
+    job_id = client.get("/rpa/pdfDownload/run").json["jobId"]
+    data = wait_for(lambda job_id: client.get(f"/rpa/jobs/{job_id}").json["data"], job_id)
+    assert data["status"] == "failed"
+    assert data["error"] == "浏览器启动失败"
+    assert client.get("/rpa/jobs/不存在").status_code == 404
+
+def read_events(client, query, events, count):
+    """在线程中订阅 /rpa/events, 收到 count 个任务结束事件后断开"""
+    response = client.get("/rpa/events" + query, buffered=False)
+    try:
+        for chunk in response.response:
+            chunk = chunk.decode("utf-8") if isinstance(chunk, bytes) else chunk
+            if not chunk.startswith("data: "):
+                continue
+            events.append(json.loads(chunk[len("data: "):]))
+            if sum(event["type"] in ("finished", "failed") for event in events) == count:
+                break
+    finally:
+        response.close()
+
+def test_events_stream_progress_and_filter_by_job(client, monkeypatch):
+    job_ids = iter(["job-a", "job-b"])
+    monkeypatch.setattr(rpa_jobs.uuid, "uuid4", lambda: types.SimpleNamespace(hex=next(job_ids)))
+    monkeypatch.setattr(rpa_run, "run", fake_download)
+    all_events, job_b_events = [], []
+    readers = [threading.Thread(target=read_events, args=(client, "", all_events, 2)),
+               threading.Thread(target=read_events, args=(client, "?job=job-b", job_b_events, 1))]
+    for reader in readers:
+        reader.start()
+    deadline = time.monotonic() + 5
+    while len(rpa_events.bus.subscribers) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert [client.get("/rpa/pdfDownload/run").json["jobId"] for _ in range(2)] == ["job-a", "job-b"]
+    for reader in readers:
+        reader.join(5)
+    assert not any(reader.is_alive() for reader in readers)
+
+    assert {event["job"] for event in all_events} == {"job-a", "job-b"}
+    assert {event["job"] for event in job_b_events} == {"job-b"}
+    assert [event["type"] for event in job_b_events] == ["start", "voucher_done", "voucher_done", "voucher_failed", "finished"]
+    # 每个事件附带进度快照, 有凭证完成后给出预计剩余时间
+    start, first_done, *_, last = job_b_events
+    assert (start["total"], start["done"], start["eta_seconds"]) == (3, 0, None)
+    assert first_done["done"] == 1 and first_done["eta_seconds"] is not None
+    assert (last["done"], last["failed"], last["eta_seconds"]) == (2, 1, 0)
+    assert last["filePath"].endswith("20240101000000")
+    # 断开连接后取消订阅
+    assert rpa_events.bus.subscribers == []
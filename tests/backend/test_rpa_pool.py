@@ -0,0 +1,84 @@
+import contextlib
+import threading
+
+import pytest
+
+import ini_op
+import rpa_login
+import rpa_pool
+from fake_browser import FakeBrowser, FakeFrame
+
+@pytest.fixture
+def browsers(workdir, monkeypatch):
+    """模拟浏览器启动和登录, fail_login 为 True 时登录失败"""
+    launched = []
+    state = {"fail_login": False}
+
+    def launchBrowser(playwright, slow_mo=50):
+        launched.append(FakeBrowser(FakeFrame))
+        return launched[-1]
+
+    def restoreOrLogin(browser):
+        if state["fail_login"]:
+            raise RuntimeError("登录失败")
+        context = rpa_login.newContext(browser)
+        return context, context.new_page(), False
+
+    monkeypatch.setattr(rpa_pool, "sync_playwright", contextlib.nullcontext)
+    monkeypatch.setattr(rpa_login, "launchBrowser", launchBrowser)
+    monkeypatch.setattr(rpa_login, "restoreOrLogin", restoreOrLogin)
+    monkeypatch.setattr(rpa_login, "probe", lambda page, home_url: True)
+    ini_op.opinivalue("basic_config", browser_pool_size="1")
+    return launched, state
+
+def test_failed_login_closes_browser_and_relaunches(browsers):
+    launched, state = browsers
+    pool = rpa_pool.BrowserPool()
+    state["fail_login"] = True
+    with pytest.raises(RuntimeError, match="登录失败"):
+        pool.run(lambda llq: "不会执行")
+    assert launched[0].closed
+    assert pool.slots[0].browser is None and pool.slots[0].context is None
+
+    state["fail_login"] = False
+    assert pool.run(lambda llq: llq[0]) is launched[1]
+    # 登录成功后的任务复用同一个浏览器
+    assert pool.run(lambda llq: llq[0]) is launched[1]
+    assert pool.stats()["cold"]["count"] == 1 and pool.stats()["warm"]["count"] == 1
+
+def test_playwright_start_failure_fails_queued_jobs(browsers, monkeypatch):
+    def broken():
+        raise RuntimeError("playwright 启动失败")
+
+    monkeypatch.setattr(rpa_pool, "sync_playwright", broken)
+    pool = rpa_pool.BrowserPool()
+    futures = [pool.submit(lambda llq: "不会执行") for _ in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="playwright 启动失败"):
+            future.result(timeout=5)
+    assert pool.slots == []
+
+    # 启动恢复后重新提交的任务正常执行
+    monkeypatch.setattr(rpa_pool, "sync_playwright", contextlib.nullcontext)
+    assert pool.submit(lambda llq: "完成").result(timeout=5) == "完成"
+
+def test_ini_reads_are_consistent_across_threads(workdir):
+    errors = []
+
+    def read():
+        try:
+            for _ in range(200):
+                ini_op.getinivalue("pdf_config", "pz_key", "ht_key", "sort_workers")
+        except Exception as e:
+            errors.append(e)
+
+    def write():
+        for value in range(50):
+            ini_op.opinivalue("pdf_config", sort_workers=str(value % 4 + 1))
+
+    threads = [threading.Thread(target=read) for _ in range(4)] + [threading.Thread(target=write)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
@@ -0,0 +1,102 @@
+import json
+import os
+
+import fitz
+import pytest
+
+import ini_op
+import pdf_sortAndRename
+from voucher_corpus import writeVoucher
+
+TIMENOW = "20240101000000"
+
+@pytest.fixture
+def folders(workdir):
+    pdf_folder, output_folder = pdf_sortAndRename.loadConfig(TIMENOW)[:2]
+    for index in range(4):
+        writeVoucher(os.path.join(pdf_folder, f"{index:02d}.pdf"), index)
+    return pdf_folder, output_folder
+
+@pytest.fixture
+def processed(monkeypatch):
+    """记录每次运行实际整理了哪些文件"""
+    files = []
+    sortFiles = pdf_sortAndRename.sortFiles
+
+    def recording(sort_pdf, pdf_paths, sort_workers):
+        for pdf_path, result in zip(pdf_paths, sortFiles(sort_pdf, pdf_paths, sort_workers)):
+            files.append(os.path.basename(pdf_path))
+            yield result
+
+    monkeypatch.setattr(pdf_sortAndRename, "sortFiles", recording)
+    return files
+
+@pytest.fixture
+def run(processed):
+    """运行一次整理, 返回本次整理的文件"""
+    def run():
+        before = len(processed)
+        pdf_sortAndRename.run(TIMENOW)
+        return processed[before:]
+    return run
+
+def manifest(output_folder):
+    with open(os.path.join(output_folder, "manifest.jsonl"), encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def merged_pages(output_folder):
+    with fitz.open(os.path.join(output_folder, "联合打印.pdf")) as doc:
+        return len(doc)
+
+def test_unchanged_files_are_skipped(folders, run):
+    pdf_folder, output_folder = folders
+    assert run() == ["00.pdf", "01.pdf", "02.pdf", "03.pdf"]
+    assert run() == []
+    entries = manifest(output_folder)
+    assert [entry["file"] for entry in entries] == ["00.pdf", "01.pdf", "02.pdf", "03.pdf"]
+    assert entries[1]["date"] == "20240205" and entries[1]["voucher"] == "记-0001"
+    # 不保留合同时每个凭证剩下凭证页和附件页
+    assert merged_pages(output_folder) == 8
+
+def test_changed_content_is_reprocessed(folders, run):
+    pdf_folder, output_folder = folders
+    run()
+    writeVoucher(os.path.join(pdf_folder, "01.pdf"), 7)
+    assert run() == ["01.pdf"]
+    assert manifest(output_folder)[1]["voucher"] == "记-0007"
+
+def test_changed_settings_reprocess_everything(folders, run):
+    pdf_folder, output_folder = folders
+    run()
+    ini_op.opinivalue("pdf_config", keep_ht="True")
+    assert run() == ["00.pdf", "01.pdf", "02.pdf", "03.pdf"]
+    assert merged_pages(output_folder) == 16
+
+def test_deleted_output_is_reprocessed(folders, run):
+    pdf_folder, output_folder = folders
+    run()
+    os.remove(os.path.join(output_folder, manifest(output_folder)[2]["output"]))
+    assert run() == ["02.pdf"]
+    assert os.path.exists(os.path.join(output_folder, manifest(output_folder)[2]["output"]))
+
+def test_resume_after_crash(folders, run, processed, monkeypatch):
+    pdf_folder, output_folder = folders
+    sortFiles = pdf_sortAndRename.sortFiles
+
+    def crashing(sort_pdf, pdf_paths, sort_workers):
+        for count, result in enumerate(sortFiles(sort_pdf, pdf_paths, sort_workers)):
+            if count == 2:
+                raise RuntimeError("整理中途崩溃")
+            yield result
+
+    monkeypatch.setattr(pdf_sortAndRename, "sortFiles", crashing)
+    with pytest.raises(RuntimeError):
+        run()
+    # 第三个文件已整理但记录未写入清单
+    assert processed == ["00.pdf", "01.pdf", "02.pdf"]
+    assert [entry["file"] for entry in manifest(output_folder)] == ["00.pdf", "01.pdf"]
+
+    monkeypatch.setattr(pdf_sortAndRename, "sortFiles", sortFiles)
+    assert run() == ["02.pdf", "03.pdf"]
+    assert len(manifest(output_folder)) == 4
+    assert merged_pages(output_folder) == 8
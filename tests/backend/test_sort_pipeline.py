@@ -0,0 +1,86 @@
+import json
+import os
+import threading
+import time
+
+import fitz
+import pytest
+
+import pdf_download
+import pdf_sortAndRename
+from voucher_corpus import writeVoucher
+
+TIMENOW = "20240101000000"
+
+def fake_downloader(pdf_folder, on_saved, count, interval):
+    """模拟下载线程: 每隔 interval 秒保存一个凭证PDF并交给整理"""
+    def download():
+        for index in range(count):
+            time.sleep(interval)
+            pdf_path = os.path.join(pdf_folder, f"{index:02d}.pdf")
+            writeVoucher(pdf_path, index)
+            on_saved(pdf_path)
+    return threading.Thread(target=download)
+
+def manifest(output_folder):
+    with open(os.path.join(output_folder, "manifest.jsonl"), encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_sorts_while_downloading(workdir):
+    sorted_files = []
+    pipeline = pdf_sortAndRename.SortPipeline(TIMENOW, lambda pdf_path, result: sorted_files.append(os.path.basename(pdf_path)))
+    pdf_folder, output_folder = pdf_sortAndRename.loadConfig(TIMENOW)[:2]
+    try:
+        downloader = fake_downloader(pdf_folder, pipeline.submit, 5, 0.05)
+        downloader.start()
+        downloader.join()
+        pipeline.finish()
+    finally:
+        pipeline.close()
+    assert sorted(sorted_files) == ["00.pdf", "01.pdf", "02.pdf", "03.pdf", "04.pdf"]
+    assert [entry["file"] for entry in manifest(output_folder)] == sorted(sorted_files)
+    with fitz.open(os.path.join(output_folder, "联合打印.pdf")) as doc:
+        assert len(doc) == 10
+
+def test_close_is_idempotent_and_keeps_records(workdir):
+    pipeline = pdf_sortAndRename.SortPipeline(TIMENOW)
+    pdf_folder, output_folder = pdf_sortAndRename.loadConfig(TIMENOW)[:2]
+    pdf_path = os.path.join(pdf_folder, "00.pdf")
+    writeVoucher(pdf_path, 0)
+    pipeline.submit(pdf_path).result()
+    pipeline.close()
+    pipeline.close()
+    assert pipeline.manifest_file.closed
+    assert [entry["file"] for entry in manifest(output_folder)] == ["00.pdf"]
+
+def test_download_error_closes_pipeline(workdir, monkeypatch):
+    pipelines = []
+    SortPipeline = pdf_sortAndRename.SortPipeline
+
+    def tracking(*args, **kwargs):
+        pipelines.append(SortPipeline(*args, **kwargs))
+        return pipelines[-1]
+
+    def broken(*args):
+        raise ValueError("凭证列表读取失败")
+
+    monkeypatch.setattr(pdf_sortAndRename, "SortPipeline", tracking)
+    monkeypatch.setattr(pdf_download, "loadVoucherList", broken)
+    with pytest.raises(ValueError):
+        pdf_download.run((None, None, None), "0001", timenow=TIMENOW)
+    assert pipelines[0].manifest_file.closed
+    # 进程池已关闭, 不再接受新的整理任务
+    with pytest.raises(RuntimeError):
+        pipelines[0].executor.submit(print)
+
+def test_close_cancels_queued_files(workdir):
+    pipeline = pdf_sortAndRename.SortPipeline(TIMENOW, sort_workers=1)
+    pdf_folder, output_folder = pdf_sortAndRename.loadConfig(TIMENOW)[:2]
+    for index in range(8):
+        writeVoucher(os.path.join(pdf_folder, f"{index:02d}.pdf"), index)
+    futures = [pipeline.submit(os.path.join(pdf_folder, f"{index:02d}.pdf")) for index in range(8)]
+    pipeline.close()
+    cancelled = [future for future in futures if future.cancelled()]
+    # 单个进程时最多一个在整理、一个在进程池队列中, 其余排队的任务被取消
+    assert len(cancelled) >= 6
+    assert len(manifest(output_folder)) == 8 - len(cancelled)
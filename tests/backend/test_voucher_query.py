@@ -0,0 +1,61 @@
+import types
+
+import pytest
+from playwright._impl._errors import TimeoutError
+
+import pdf_download
+from fake_browser import FakeFrame, FakePage
+
+FILTER = '.lee-solution-search button:text-matches("筛选")'
+
+def downloader(frame):
+    downloader = pdf_download.VoucherDownloader(None, FakePage(frame), "unused")
+    downloader.frame = frame
+    return downloader
+
+def query_all(downloader, rows):
+    for pzrq, pzh in rows:
+        downloader.query(pzrq, pzh)
+
+def test_same_date_vouchers_share_one_date_query():
+    frame = FakeFrame({"2024-01-05": ["记-0001", "记-0002", "记-0003"], "2024-02-05": ["记-0004"]})
+    voucher = downloader(frame)
+    query_all(voucher, [("2024-01-05", "记-0001"), ("2024-01-05", "记-0002"), ("2024-01-05", "记-0003"), ("2024-02-05", "记-0004")])
+    assert (voucher.date_queries, voucher.number_queries) == (2, 0)
+    assert frame.actions.count(FILTER) == 2
+
+def test_number_fallback_then_date_grid_is_restored():
+    # 记-0002 不在当天列表的第一页
+    frame = FakeFrame({"2024-01-05": ["记-0001", "记-0003", "记-0004"]})
+    voucher = downloader(frame)
+    query_all(voucher, [("2024-01-05", "记-0001"), ("2024-01-05", "记-0002")])
+    assert voucher.number_filtered and frame.rows == ["记-0002"]
+
+    query_all(voucher, [("2024-01-05", "记-0003"), ("2024-01-05", "记-0004")])
+    # 恢复按日期筛选的列表后, 其余凭证不再按凭证号筛选
+    assert not voucher.number_filtered
+    assert frame.fields["#FSBZDJ_PZH"] == "" and frame.rows == ["记-0001", "记-0003", "记-0004"]
+    assert (voucher.date_queries, voucher.number_queries) == (2, 1)
+
+def test_search_retries_until_grid_responds():
+    frame = FakeFrame({"2024-01-05": ["记-0001"]}, drop_searches=2)
+    voucher = downloader(frame)
+    voucher.query("2024-01-05", "记-0001")
+    assert frame.actions.count(FILTER) == 3
+
+def test_search_gives_up_after_retries():
+    frame = FakeFrame({"2024-01-05": ["记-0001"]}, drop_searches=3)
+    voucher = downloader(frame)
+    with pytest.raises(TimeoutError):
+        voucher.query("2024-01-05", "记-0001")
+    assert frame.actions.count(FILTER) == 3
+
+def test_responses_from_other_frames_are_ignored():
+    frame = FakeFrame({"2024-01-05": ["记-0001"]})
+    voucher = downloader(frame)
+    other = types.SimpleNamespace(frame=FakeFrame(), request=types.SimpleNamespace(resource_type="xhr"))
+    assert not voucher.isGridResponse(other)
+    other.frame = frame
+    assert voucher.isGridResponse(other)
+    other.request.resource_type = "image"
+    assert not voucher.isGridResponse(other)
@@ -0,0 +1,130 @@
+"""用真实的 playwright 浏览器和本地静态页面测试凭证查询
+
+静态页面模仿联合打印: 主页面每 50 毫秒请求一次 /heartbeat, 列表在 iframe 中,
+点击筛选后 iframe 请求 /grid 并按返回的凭证号渲染表格。未安装浏览器时跳过。
+"""
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from playwright.sync_api import sync_playwright
+
+import pdf_download
+
+INDEX = """<html><body>
+<iframe id="rtf_iframe_1" src="/print" style="width:1000px;height:800px"></iframe>
+<script>setInterval(() => fetch('/heartbeat'), 50);</script>
+</body></html>"""
+
+PICKER = """<div>
+<span lay-type="year">年</span><ul><li lay-ym="2024">2024</li></ul>
+<span lay-type="month">月</span><ul><li lay-ym="0">1月</li><li lay-ym="1">2月</li></ul>
+<table><tr><td lay-ymd="2024-1-5">5</td><td lay-ymd="2024-2-5">5</td></tr></table>
+</div>"""
+
+PRINT = """<html><body>
+<input id="FSBZDJ_PZRQ_1"><input id="FSBZDJ_PZH"><input id="FSBZDJ_ZZPZH">
+%s%s<button class="laydate-btns-confirm">确定</button>
+<div class="lee-solution-search"><button>筛选</button></div>
+<table id="grid"></table>
+<script>
+let picked = '';
+document.querySelectorAll('td[lay-ymd]').forEach(td => td.onclick = () => {
+    const [year, month, day] = td.getAttribute('lay-ymd').split('-');
+    picked = year + '-' + month.padStart(2, '0') + '-' + day.padStart(2, '0');
+});
+document.querySelector('.lee-solution-search button').onclick = async () => {
+    document.querySelector('#grid').innerHTML = '';
+    const pzh = document.querySelector('#FSBZDJ_PZH').value;
+    const response = await fetch('/grid?date=' + picked + '&pzh=' + encodeURIComponent(pzh));
+    const rows = await response.json();
+    document.querySelector('#grid').innerHTML = rows.map((pzh, i) =>
+        `<tr><td id="r${i}_FSBZDJ_PZH"><a title="${pzh}">${pzh}</a></td></tr>`).join('');
+};
+</script>
+</body></html>""" % (PICKER, PICKER)
+
+# 按日期筛选时只返回第一页, 记-0002 需要按凭证号筛选
+FIRST_PAGE = {"2024-01-05": ["记-0001", "记-0003"], "2024-02-05": ["记-0004"]}
+
+class Handler(BaseHTTPRequestHandler):
+    grid_requests = []
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        if url.path == "/grid":
+            date, pzh = query.get("date", [""])[0], query.get("pzh", [""])[0]
+            self.grid_requests.append((date, pzh))
+            # 列表数据稍慢返回, 等待期间主页面还会收到心跳响应
+            time.sleep(0.3)
+            self.reply("application/json", json.dumps([pzh] if pzh else FIRST_PAGE.get(date, [])))
+        elif url.path == "/heartbeat":
+            self.reply("application/json", "{}")
+        else:
+            self.reply("text/html; charset=utf-8", PRINT if url.path == "/print" else INDEX)
+
+    def reply(self, content_type, body):
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    Handler.grid_requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/"
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture
+def page(server):
+    playwright = sync_playwright().start()
+    try:
+        browser = playwright.chromium.launch(headless=True)
+    except Exception as e:
+        playwright.stop()
+        pytest.skip(f"无法启动 Chromium: {e}")
+    page = browser.new_page()
+    page.goto(server)
+    yield page
+    browser.close()
+    playwright.stop()
+
+@pytest.fixture
+def downloader(page):
+    downloader = pdf_download.VoucherDownloader(None, page, "unused")
+    downloader.frame = page.wait_for_selector("iframe#rtf_iframe_1").content_frame()
+    downloader.frame.wait_for_selector("#FSBZDJ_PZH")
+    # 记录筛选时每个响应的判断结果
+    downloader.checked = []
+    isGridResponse = downloader.isGridResponse
+
+    def recording(response):
+        result = isGridResponse(response)
+        downloader.checked.append((urllib.parse.urlparse(response.url).path, result))
+        return result
+
+    downloader.isGridResponse = recording
+    return downloader
+
+def test_query_waits_for_the_frame_grid_response(downloader):
+    downloader.query("2024-01-05", "记-0001")
+    downloader.query("2024-01-05", "记-0002")
+    downloader.query("2024-01-05", "记-0003")
+    downloader.query("2024-02-05", "记-0004")
+    assert Handler.grid_requests == [("2024-01-05", ""), ("2024-01-05", "记-0002"), ("2024-01-05", ""), ("2024-02-05", "")]
+    assert (downloader.date_queries, downloader.number_queries) == (3, 1)
+    # 主页面的心跳请求不会被当作列表数据
+    assert {path for path, result in downloader.checked if result} == {"/grid"}
+    assert ("/heartbeat", False) in downloader.checked
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# 被测服务以 AI/function_call_api 为工作目录运行, 模块按 services.xxx 导入
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "AI", "function_call_api"))
+
+# 导入 agent_service 时会在当前目录创建LLM缓存数据库, 测试在临时目录中运行以免污染仓库
+os.chdir(tempfile.mkdtemp(prefix="function_call_api_"))
@@ -0,0 +1,61 @@
+"""测试用的脚本化LLM, 不访问Ollama服务"""
+import asyncio
+import json
+import time
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.llms import LLM
+
+def final_answer(text: str) -> str:
+    """STRUCTURED_CHAT 智能体的最终回复格式"""
+    return "Action:\n```\n" + json.dumps({"action": "Final Answer", "action_input": text}, ensure_ascii=False) + "\n```"
+
+def tool_call(*actions) -> str:
+    """STRUCTURED_CHAT 智能体的工具调用格式, 传入多个 (工具名, 参数) 时生成动作列表"""
+    blobs = [{"action": name, "action_input": args} for name, args in actions]
+    blob = blobs[0] if len(blobs) == 1 else blobs
+    return "Action:\n```\n" + json.dumps(blob, ensure_ascii=False) + "\n```"
+
+class ScriptedLLM(LLM):
+    """依次返回 responses 中的回复, 到末尾后循环
+
+    delay 模拟模型响应时间; token_delay 大于0时逐字符回调 on_llm_new_token, 模拟流式输出。
+    token 数按字符数计算, 不依赖 transformers。
+    """
+    responses: List[str]
+    delay: float = 0.0
+    token_delay: float = 0.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _next(self) -> str:
+        response = self.responses[self.calls % len(self.responses)]
+        self.calls += 1
+        return response
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None,
+              run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> str:
+        time.sleep(self.delay)
+        response = self._next()
+        for token in response:
+            time.sleep(self.token_delay)
+            if run_manager:
+                run_manager.on_llm_new_token(token)
+        return response
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None,
+                     run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> str:
+        await asyncio.sleep(self.delay)
+        response = self._next()
+        for token in response:
+            await asyncio.sleep(self.token_delay)
+            if run_manager:
+                await run_manager.on_llm_new_token(token)
+        return response
+
+    def get_num_tokens(self, text: str) -> int:
+        return len(text)
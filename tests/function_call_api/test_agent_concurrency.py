@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+from langchain.memory import ConversationBufferMemory
+
+from services import agent_service
+from services.agent_service import AgentFactory
+from fake_llm import ScriptedLLM, final_answer
+
+def run_sessions(monkeypatch, count, delay):
+    """count 个会话同时请求, 返回总用时和回复"""
+    monkeypatch.setattr(agent_service, "create_llm", lambda: ScriptedLLM(responses=[final_answer("好的")], delay=delay))
+    factory = AgentFactory()
+
+    async def main():
+        agents = [factory.get_agent(ConversationBufferMemory()) for _ in range(count)]
+        start = time.perf_counter()
+        results = await asyncio.gather(*(factory.ainvoke(agent, f"问题{i}") for i, agent in enumerate(agents)))
+        return time.perf_counter() - start, results
+
+    return asyncio.run(main())
+
+def test_parallel_sessions_overlap(monkeypatch):
+    monkeypatch.setattr(agent_service, "AGENT_MAX_CONCURRENCY", 4)
+    elapsed, results = run_sessions(monkeypatch, 4, 0.5)
+    assert [result["output"] for result in results] == ["好的"] * 4
+    # 串行执行需要 2 秒
+    assert elapsed < 1.0
+
+def test_concurrency_limit(monkeypatch):
+    monkeypatch.setattr(agent_service, "AGENT_MAX_CONCURRENCY", 2)
+    elapsed, results = run_sessions(monkeypatch, 4, 0.3)
+    assert len(results) == 4
+    # 同时最多执行2个, 4个请求至少分两批
+    assert elapsed >= 0.6
+
+def test_sessions_keep_separate_memory(monkeypatch):
+    monkeypatch.setattr(agent_service, "create_llm", lambda: ScriptedLLM(responses=[final_answer("收到")]))
+    factory = AgentFactory()
+    first, second = ConversationBufferMemory(), ConversationBufferMemory()
+
+    async def main():
+        await factory.ainvoke(factory.get_agent(first), "第一个会话")
+        await factory.ainvoke(factory.get_agent(second), "第二个会话")
+
+    asyncio.run(main())
+    assert first.chat_memory.messages[0].content == "第一个会话"
+    assert second.chat_memory.messages[0].content == "第二个会话"
+    assert len(first.chat_memory.messages) == 2
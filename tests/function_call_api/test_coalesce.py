@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from services import agent_service
+from services.agent_service import AgentFactory
+from services.coalesce_service import SingleFlight
+from fake_llm import ScriptedLLM, final_answer
+
+def test_identical_calls_execute_once():
+    flight = SingleFlight()
+    executions = []
+
+    async def compute():
+        executions.append(1)
+        await asyncio.sleep(0.1)
+        return "结果"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", compute) for _ in range(50)))
+
+    assert asyncio.run(main()) == ["结果"] * 50
+    assert len(executions) == 1
+    assert flight.stats() == {"in_flight": 0, "executed": 1, "shared": 49}
+
+def test_different_keys_and_later_calls_execute_again():
+    flight = SingleFlight()
+    executions = []
+
+    async def compute():
+        executions.append(1)
+        await asyncio.sleep(0.05)
+        return len(executions)
+
+    async def main():
+        await asyncio.gather(flight.do("a", compute), flight.do("b", compute))
+        # 前一次计算完成后不再共享结果
+        await flight.do("a", compute)
+
+    asyncio.run(main())
+    assert len(executions) == 3
+
+def test_error_is_shared_and_not_cached():
+    flight = SingleFlight()
+    executions = []
+
+    async def fail():
+        executions.append(1)
+        await asyncio.sleep(0.05)
+        raise RuntimeError("失败")
+
+    async def main():
+        results = await asyncio.gather(*(flight.do("key", fail) for _ in range(5)), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        with pytest.raises(RuntimeError):
+            await flight.do("key", fail)
+
+    asyncio.run(main())
+    assert len(executions) == 2
+
+def test_cancelled_caller_does_not_cancel_others():
+    flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.1)
+        return "结果"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("key", compute))
+        second = asyncio.ensure_future(flight.do("key", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "结果"
+
+def test_coalesced_agent_calls_llm_once(monkeypatch):
+    llm = ScriptedLLM(responses=[final_answer("好的")], delay=0.2)
+    monkeypatch.setattr(agent_service, "create_llm", lambda: llm)
+    factory = AgentFactory()
+
+    async def main():
+        return await asyncio.gather(*(factory.ainvoke_coalesced("同一个问题") for _ in range(10)))
+
+    results = asyncio.run(main())
+    assert [result["output"] for result in results] == ["好的"] * 10
+    assert llm.calls == 1
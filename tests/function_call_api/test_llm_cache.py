@@ -0,0 +1,56 @@
+import asyncio
+
+from langchain_core.outputs import Generation
+
+from services.cache_service import SQLiteLLMCache
+from fake_llm import ScriptedLLM
+
+def test_repeated_prompt_is_served_from_cache(tmp_path):
+    cache = SQLiteLLMCache(str(tmp_path / "llm_cache.db"), max_bytes=1024 * 1024)
+    llm = ScriptedLLM(responses=["第一次", "第二次"], cache=cache)
+    assert llm.invoke("北京天气") == "第一次"
+    assert llm.invoke("北京天气") == "第一次"
+    assert llm.calls == 1
+    assert cache.stats()["hits"] == 1
+
+def test_normalized_prompts_share_an_entry(tmp_path):
+    cache = SQLiteLLMCache(str(tmp_path / "llm_cache.db"), max_bytes=1024 * 1024, normalize=True)
+    llm = ScriptedLLM(responses=["回答"], cache=cache)
+    llm.invoke("北京  天气？")
+    llm.invoke("北京 天气?")
+    assert llm.calls == 1
+
+def test_counters_are_exact_under_concurrent_async_lookups(tmp_path):
+    cache = SQLiteLLMCache(str(tmp_path / "llm_cache.db"), max_bytes=1024 * 1024)
+    cache.update("问题", "llm", [Generation(text="回答")])
+
+    async def main():
+        # alookup 在线程池中执行 lookup
+        await asyncio.gather(*(cache.alookup("问题" if i % 2 else f"未缓存{i}", "llm") for i in range(200)))
+
+    asyncio.run(main())
+    stats = cache.stats()
+    assert stats["hits"] == 100
+    assert stats["misses"] == 100
+
+def test_eviction_keeps_size_under_limit(tmp_path):
+    cache = SQLiteLLMCache(str(tmp_path / "llm_cache.db"), max_bytes=4096)
+    llm = ScriptedLLM(responses=["回答" * 100], cache=cache)
+    for i in range(50):
+        llm.invoke(f"问题{i}")
+    assert 0 < cache.stats()["bytes"] <= 4096
+
+def test_different_llm_configs_do_not_share_entries(tmp_path):
+    path = str(tmp_path / "llm_cache.db")
+    qwen = SQLiteLLMCache(path, max_bytes=1024 * 1024, llm_params={"model": "qwen2.5", "temperature": 0.0, "base_url": "http://a:11434"})
+    llama = SQLiteLLMCache(path, max_bytes=1024 * 1024, llm_params={"model": "llama3", "temperature": 0.0, "base_url": "http://a:11434"})
+    warm = SQLiteLLMCache(path, max_bytes=1024 * 1024, llm_params={"model": "qwen2.5", "temperature": 0.7, "base_url": "http://a:11434"})
+    # 参数字符串相同, 只有模型和温度不同
+    first = ScriptedLLM(responses=["qwen回答"], cache=qwen)
+    second = ScriptedLLM(responses=["llama回答"], cache=llama)
+    third = ScriptedLLM(responses=["高温回答"], cache=warm)
+    assert first.invoke("北京天气") == "qwen回答"
+    assert second.invoke("北京天气") == "llama回答"
+    assert third.invoke("北京天气") == "高温回答"
+    assert (first.calls, second.calls, third.calls) == (1, 1, 1)
+    assert ScriptedLLM(responses=["未调用"], cache=qwen).invoke("北京天气") == "qwen回答"
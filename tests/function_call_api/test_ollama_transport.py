@@ -0,0 +1,119 @@
+"""Ollama传输层在桩HTTP服务上的重试、超时和熔断行为"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from services.ollama_transport import CircuitOpenError, OllamaTransport
+
+
+class StubOllama(BaseHTTPRequestHandler):
+    """按 server.script 依次返回状态码, 脚本用完后返回200; server.delay 控制响应前的等待时间"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.hits += 1
+        status = self.server.script.pop(0) if self.server.script else 200
+        time.sleep(self.server.delay)
+        body = json.dumps({"model": "stub", "response": "你好", "done": True}).encode()
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubOllama)
+    httpd.daemon_threads = True
+    httpd.hits, httpd.script, httpd.delay = 0, [], 0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_transport(**overrides):
+    options = dict(pool_size=4, connect_timeout=1, read_timeout=0.3, max_retries=2,
+                   retry_backoff=0.01, breaker_threshold=3, breaker_reset=0.3)
+    options.update(overrides)
+    return OllamaTransport(**options)
+
+
+def host(httpd):
+    return "http://127.0.0.1:%d" % httpd.server_address[1]
+
+
+def post(transport, httpd):
+    with httpx.Client(**transport.client_kwargs()) as client:
+        return client.post(host(httpd) + "/api/generate", json={"model": "stub", "prompt": "hi"})
+
+
+def test_retries_503_then_succeeds(server):
+    server.script = [503, 503]
+    transport = make_transport()
+    assert post(transport, server).status_code == 200
+    assert server.hits == 3
+    assert transport.breaker.state == "closed"
+
+
+def test_slow_response_raises_read_timeout_and_counts_failure(server):
+    server.delay = 0.6
+    transport = make_transport(breaker_threshold=1)
+    with pytest.raises(httpx.ReadTimeout):
+        post(transport, server)
+    # 读取超时说明模型已经开始处理请求, 不重试
+    assert server.hits == 1
+    assert transport.breaker.state == "open"
+
+
+def test_persistent_500_opens_breaker_then_probe_closes_it(server):
+    server.script = [500] * 3
+    transport = make_transport()
+    for _ in range(3):
+        assert post(transport, server).status_code == 500
+    assert transport.breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        post(transport, server)
+    assert server.hits == 3
+
+    time.sleep(0.35)
+    assert post(transport, server).status_code == 200
+    assert transport.breaker.state == "closed"
+    assert server.hits == 4
+
+
+def test_get_client_shares_transport_and_generates(server):
+    server.script = [503]
+    transport = make_transport()
+    client = transport.get_client(host(server), 5)
+    assert client is transport.get_client(host(server), 5)
+    assert client is not transport.get_client(host(server))
+    assert client.generate(model="stub", prompt="hi")["response"] == "你好"
+    assert server.hits == 2
+
+
+def test_async_transport_shares_breaker(server):
+    server.script = [500]
+    transport = make_transport(breaker_threshold=1)
+
+    async def run():
+        async with httpx.AsyncClient(**transport.async_client_kwargs()) as client:
+            return await client.post(host(server) + "/api/generate", json={})
+
+    assert asyncio.run(run()).status_code == 500
+    with pytest.raises(CircuitOpenError):
+        post(transport, server)
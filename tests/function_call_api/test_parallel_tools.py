@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+from langchain.tools import StructuredTool
+from langchain_core.agents import AgentAction
+
+from services.agent_service import ParallelStructuredChatOutputParser, create_agent, create_parallel_agent
+from fake_llm import ScriptedLLM, final_answer, tool_call
+
+CITIES = ["北京", "上海", "广州"]
+
+def slow_tools(delay):
+    def get_weather(location: str) -> str:
+        time.sleep(delay)
+        return f"{location} 晴"
+
+    return [StructuredTool.from_function(get_weather, name="GetWeather", description="查询天气")]
+
+def run(agent):
+    start = time.perf_counter()
+    result = asyncio.run(agent.ainvoke({"input": "北京、上海、广州的天气"}))
+    return time.perf_counter() - start, result
+
+def sequential_agent(delay):
+    script = [tool_call(("GetWeather", {"location": city})) for city in CITIES] + [final_answer("都是晴天")]
+    return create_agent(slow_tools(delay), ScriptedLLM(responses=script))
+
+def parallel_agent(delay):
+    script = [tool_call(*(("GetWeather", {"location": city}) for city in CITIES)), final_answer("都是晴天")]
+    return create_parallel_agent(slow_tools(delay), ScriptedLLM(responses=script))
+
+def test_parser_returns_action_list():
+    actions = ParallelStructuredChatOutputParser().parse(
+        tool_call(("GetWeather", {"location": "北京"}), ("GetWeather", {"location": "上海"})))
+    assert [action.tool_input for action in actions] == [{"location": "北京"}, {"location": "上海"}]
+    assert all(isinstance(action, AgentAction) for action in actions)
+
+def test_parser_keeps_single_action_and_final_answer():
+    parser = ParallelStructuredChatOutputParser()
+    assert parser.parse(tool_call(("GetWeather", {"location": "北京"}))).tool == "GetWeather"
+    assert parser.parse(final_answer("完成")).return_values == {"output": "完成"}
+
+def test_parallel_tool_calls_save_wall_clock_time():
+    sequential_time, sequential = run(sequential_agent(0.4))
+    parallel_time, parallel = run(parallel_agent(0.4))
+    assert sequential["output"] == parallel["output"] == "都是晴天"
+    # 3 个 0.4 秒的工具: 顺序约 1.2 秒, 并行约 0.4 秒
+    assert sequential_time >= 1.2
+    assert parallel_time < 0.8
@@ -0,0 +1,75 @@
+import asyncio
+
+from langchain.memory import ChatMessageHistory
+
+from services import session_service
+from services.session_service import SessionManager, TrimmedWindowMemory, create_memory
+from services.session_store import InMemorySessionStore, SQLiteSessionStore
+
+def chat(memory, turns):
+    for i in range(turns):
+        memory.load_memory_variables({})
+        memory.save_context({"input": f"问题{i}"}, {"output": f"回答{i}"})
+
+def test_window_memory_trims_history():
+    memory = create_memory(ChatMessageHistory(), "window")
+    assert isinstance(memory, TrimmedWindowMemory)
+    chat(memory, 20)
+    messages = memory.chat_memory.messages
+    assert len(messages) == 2 * memory.k
+    assert messages[-1].content == "回答19"
+
+def test_window_memory_trims_sqlite_history(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    memory = TrimmedWindowMemory(chat_memory=store.history("s1"), k=2)
+    chat(memory, 10)
+
+    async def main():
+        await memory.asave_context({"input": "问题10"}, {"output": "回答10"})
+
+    asyncio.run(main())
+    assert [message.content for message in store.history("s1").messages] == ["问题9", "回答9", "问题10", "回答10"]
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def manager(monkeypatch, max_sessions=3, ttl=60):
+    clock = Clock()
+    monkeypatch.setattr(session_service.time, "monotonic", clock)
+    return SessionManager(InMemorySessionStore(), max_sessions=max_sessions, ttl=ttl), clock
+
+def test_lru_eviction(monkeypatch):
+    sessions, clock = manager(monkeypatch)
+    first = sessions.get_memory("a")
+    sessions.get_memory("b")
+    sessions.get_memory("c")
+    # 访问 a 后最久未访问的是 b
+    assert sessions.get_memory("a") is first
+    sessions.get_memory("d")
+    assert sessions.stats()["sessions"] == 3
+    assert sessions.get_memory("a") is first
+    assert sessions.stats()["evicted"] == 1
+    sessions.get_memory("b")
+    # b 已被淘汰, 重新创建后又挤掉了最久未访问的 c
+    assert sessions.stats()["evicted"] == 2
+
+def test_ttl_eviction(monkeypatch):
+    sessions, clock = manager(monkeypatch, ttl=60)
+    first = sessions.get_memory("a")
+    clock.now += 30
+    sessions.get_memory("b")
+    clock.now += 40
+    # a 已空闲70秒过期, b 空闲40秒仍保留
+    assert sessions.stats() == {"sessions": 1, "bytes": 0, "evicted": 1}
+    assert sessions.get_memory("a") is not first
+
+def test_stats_reports_bytes(monkeypatch):
+    sessions, clock = manager(monkeypatch)
+    sessions.get_memory("a").save_context({"input": "你好"}, {"output": "hello"})
+    assert sessions.stats() == {"sessions": 1, "bytes": len("你好".encode("utf-8")) + len("hello"), "evicted": 0}
+    sessions.clear_memory("a")
+    assert sessions.stats()["sessions"] == 0
@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+from langchain.memory import ChatMessageHistory, ConversationSummaryBufferMemory
+from langchain.schema import HumanMessage
+
+from services.session_service import PersistentSummaryBufferMemory, create_memory
+from services.session_store import SQLiteSessionStore
+from fake_llm import ScriptedLLM
+
+SERVICE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "AI", "function_call_api")
+
+def chat(memory, turns):
+    for i in range(turns):
+        memory.load_memory_variables({})
+        memory.save_context({"input": f"问题{i}"}, {"output": f"回答{i}"})
+
+def summary_llm():
+    return ScriptedLLM(responses=["摘要"])
+
+def test_sqlite_summary_memory_matches_in_memory(tmp_path):
+    in_memory = ConversationSummaryBufferMemory(chat_memory=ChatMessageHistory(), llm=summary_llm(), max_token_limit=30)
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    persistent = PersistentSummaryBufferMemory(chat_memory=store.history("s1"), llm=summary_llm(), max_token_limit=30)
+    chat(in_memory, 6)
+    chat(persistent, 6)
+
+    expected = [message.content for message in in_memory.chat_memory.messages]
+    assert [message.content for message in store.history("s1").messages] == expected
+    # 已总结的消息从数据库中删除, 不会无限增长
+    assert 0 < len(expected) < 12
+    assert store.history("s1").summary == in_memory.moving_summary_buffer == "摘要"
+
+def test_summary_is_shared_between_store_instances(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    chat(PersistentSummaryBufferMemory(chat_memory=SQLiteSessionStore(path).history("s1"), llm=summary_llm(), max_token_limit=30), 6)
+
+    # 另一个 worker 新建的记忆对象读取到同一份摘要和剩余消息
+    other = PersistentSummaryBufferMemory(chat_memory=SQLiteSessionStore(path).history("s1"), llm=summary_llm(), max_token_limit=30)
+    history = other.load_memory_variables({})["history"]
+    assert history.startswith("System: 摘要")
+    assert "问题5" in history and "问题0" not in history
+
+def test_create_memory_uses_persistent_summary_for_sqlite(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    assert isinstance(create_memory(store.history("s1"), "summary"), PersistentSummaryBufferMemory)
+    assert not isinstance(create_memory(ChatMessageHistory(), "summary"), PersistentSummaryBufferMemory)
+
+def test_delete_removes_messages_and_summary(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    chat(PersistentSummaryBufferMemory(chat_memory=store.history("s1"), llm=summary_llm(), max_token_limit=30), 6)
+    store.delete("s1")
+    assert store.history("s1").messages == []
+    assert store.history("s1").summary == ""
+
+def run_worker(path, code):
+    """在独立进程中操作同一个会话数据库, 模拟另一个 uvicorn worker"""
+    script = textwrap.dedent(f"""
+        from services.session_store import SQLiteSessionStore
+        from langchain.schema import HumanMessage, AIMessage
+        history = SQLiteSessionStore({path!r}).history("shared")
+    """) + textwrap.dedent(code)
+    result = subprocess.run([sys.executable, "-c", script], cwd=SERVICE_DIR, capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+def test_two_processes_share_session(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    history = SQLiteSessionStore(path).history("shared")
+
+    run_worker(path, """
+        history.add_messages([HumanMessage(content="你好"), AIMessage(content="你好, 有什么可以帮你")])
+    """)
+    assert [message.content for message in history.messages] == ["你好", "你好, 有什么可以帮你"]
+
+    history.add_message(HumanMessage(content="北京天气"))
+    assert run_worker(path, """
+        print(len(history.messages), history.messages[-1].content)
+    """) == "3 北京天气"
@@ -0,0 +1,55 @@
+import asyncio
+import json
+import time
+
+from langchain.memory import ConversationBufferMemory
+
+from services import agent_service, stream_service
+from services.agent_service import AgentFactory
+from fake_llm import ScriptedLLM, final_answer
+
+def parse(frame):
+    assert frame.startswith("data: ") and frame.endswith("\n\n")
+    return json.loads(frame[len("data: "):])
+
+def collect(monkeypatch, llm, limit=None):
+    """读取流式响应, 返回 [(收到时间, 事件)]"""
+    monkeypatch.setattr(agent_service, "create_llm", lambda: llm)
+    monkeypatch.setattr(stream_service, "agent_factory", AgentFactory())
+
+    async def main():
+        events = []
+        start = time.perf_counter()
+        stream = stream_service.create_stream_response("你好", ConversationBufferMemory())
+        async for frame in stream:
+            events.append((time.perf_counter() - start, parse(frame)))
+            if limit and len(events) >= limit:
+                await stream.aclose()
+                break
+        return events
+
+    return asyncio.run(main())
+
+def test_first_token_arrives_before_generation_finishes(monkeypatch):
+    events = collect(monkeypatch, ScriptedLLM(responses=[final_answer("流式输出测试")], token_delay=0.01))
+    tokens = [(at, event) for at, event in events if event["type"] == "token"]
+    total = events[-1][0]
+    assert tokens and total > 0.5
+    # 首个token在整段回复生成完之前就已发出
+    assert tokens[0][0] < 0.2
+    assert "".join(event["data"] for _, event in tokens) == final_answer("流式输出测试")
+    assert events[-1][1] == {"type": "output", "data": "流式输出测试"}
+
+def test_client_disconnect_cancels_agent(monkeypatch):
+    llm = ScriptedLLM(responses=[final_answer("很长的回复" * 20)], token_delay=0.01)
+    events = collect(monkeypatch, llm, limit=3)
+    assert len(events) == 3
+    assert all(event["type"] != "output" for _, event in events)
+
+class FailingLLM(ScriptedLLM):
+    async def _acall(self, *args, **kwargs):
+        raise ConnectionError("Ollama服务不可用")
+
+def test_error_is_sent_as_event(monkeypatch):
+    events = collect(monkeypatch, FailingLLM(responses=[""]))
+    assert events[-1][1] == {"type": "error", "data": "Ollama服务不可用"}
@@ -0,0 +1,57 @@
+import functools
+import time
+
+from models.schemas import GetIncome, GetWeather
+from services.cache_service import ToolCache
+
+def counting(func):
+    calls = []
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        calls.append((args, kwargs))
+        return func(*args, **kwargs)
+
+    wrapper.calls = calls
+    return wrapper
+
+def test_equivalent_arguments_hit_the_same_entry():
+    cache = ToolCache()
+    income = counting(lambda company, year: f"{company}{year}")
+    cached = cache.wrap("GetIncome", income, GetIncome, ttl=60)
+    assert cached("幸福无限有限公司", 2023) == cached(company="幸福无限有限公司", year="2023")
+    assert len(income.calls) == 1
+    assert cache.stats()["hits"] == 1
+
+def test_expired_entries_are_refreshed():
+    cache = ToolCache()
+    weather = counting(lambda location: location)
+    cached = cache.wrap("GetWeather", weather, GetWeather, ttl=0.05)
+    cached("北京")
+    time.sleep(0.1)
+    cached("北京")
+    assert len(weather.calls) == 2
+
+def test_size_is_capped_without_calling_stats():
+    cache = ToolCache(max_entries=10)
+    cached = cache.wrap("GetWeather", lambda location: location, GetWeather, ttl=60)
+    for i in range(100):
+        cached(f"城市{i}")
+    assert len(cache._entries) == 10
+    # 最近使用的条目保留
+    assert ("GetWeather", '{"location": "城市99"}') in cache._entries
+    assert cache.stats()["evicted"] == 90
+
+def test_expired_entries_are_evicted_before_live_ones():
+    cache = ToolCache(max_entries=3)
+    short = cache.wrap("GetWeather", lambda location: location, GetWeather, ttl=0.05)
+    long = cache.wrap("GetIncome", lambda company, year: company, GetIncome, ttl=60)
+    long("甲公司", 2023)
+    short("北京")
+    short("上海")
+    time.sleep(0.1)
+    short("广州")
+    long("乙公司", 2023)
+    assert set(key[0] for key in cache._entries) == {"GetIncome", "GetWeather"}
+    assert len(cache._entries) == 3
+    assert ("GetIncome", '{"company": "甲公司", "year": 2023}') in cache._entries